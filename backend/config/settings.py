@@ -1,4 +1,5 @@
 import os
+import sys
 from pathlib import Path
 from decouple import config
 import dj_database_url
@@ -9,6 +10,8 @@ SECRET_KEY = config('SECRET_KEY', default='django-insecure-test-key-change-in-pr
 
 DEBUG = config('DEBUG', default=True, cast=bool)
 
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+
 # Allow Render domains and local development
 ALLOWED_HOSTS_STR = config('ALLOWED_HOSTS', default='localhost,127.0.0.1,*.onrender.com,*.web.app')
 ALLOWED_HOSTS = [host.strip() for host in ALLOWED_HOSTS_STR.split(',')]
@@ -91,6 +94,54 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Caches
+# Question catalog cache: 'locmem' (per process), 'file' (per host) or
+# 'redis' (shared). The catalog version lives in the same cache, so use
+# file or redis when several processes serve the API.
+CATALOG_CACHE_BACKEND = config('CATALOG_CACHE_BACKEND', default='locmem')
+CATALOG_CACHE_TTL = config('CATALOG_CACHE_TTL', default=3600, cast=int)
+# Seconds before the catalog version is renewed (0: never). A per-process
+# locmem cache does not see bumps made by other processes (imports, the
+# admin in another worker, Celery), so there it expires to bound staleness
+CATALOG_VERSION_TTL = config(
+    'CATALOG_VERSION_TTL', default=60 if CATALOG_CACHE_BACKEND == 'locmem' else 0, cast=int
+)
+CATALOG_CACHES = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'question-catalog',
+        'TIMEOUT': CATALOG_CACHE_TTL,
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': config('CATALOG_CACHE_LOCATION', default=str(BASE_DIR / 'cache' / 'catalog')),
+        'TIMEOUT': CATALOG_CACHE_TTL,
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': config('REDIS_URL', default='redis://localhost:6379/0'),
+        'KEY_PREFIX': 'catalog',
+        'TIMEOUT': CATALOG_CACHE_TTL,
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Grading results of identical submissions (LRU with TTL)
+    'grading': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'grading-results',
+        'TIMEOUT': config('GRADING_CACHE_TTL', default=3600, cast=int),
+        'OPTIONS': {
+            'MAX_ENTRIES': config('GRADING_CACHE_MAX_ENTRIES', default=10000, cast=int),
+        },
+    },
+    # Question catalog data, stamped with the catalog version
+    'catalog': CATALOG_CACHES[CATALOG_CACHE_BACKEND],
+}
+
 # Rest Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
@@ -124,6 +175,8 @@ CORS_ALLOW_HEADERS = [
 ]
 
 CORS_ALLOW_CREDENTIALS = True
+# Pending answers tell clients when to poll again
+CORS_EXPOSE_HEADERS = ['Retry-After']
 
 # Google OAuth
 SOCIALACCOUNT_PROVIDERS = {
@@ -151,6 +204,66 @@ CELERY_BROKER_URL = config('REDIS_URL', default='redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = config('REDIS_URL', default='redis://localhost:6379/0')
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
+# Without a Redis URL tasks run inline in the calling process
+CELERY_TASK_ALWAYS_EAGER = config(
+    'CELERY_TASK_ALWAYS_EAGER', default=not config('REDIS_URL', default=''), cast=bool
+)
+CELERY_BEAT_SCHEDULE = {
+    # Leaderboards are maintained incrementally; the full refresh is a safety net
+    'refresh-leaderboard': {
+        'task': 'quiz_app.tasks.refresh_leaderboard',
+        'schedule': config('LEADERBOARD_REFRESH_SECONDS', default=86400, cast=float),
+    },
+    'expire-leaderboard': {
+        'task': 'quiz_app.tasks.expire_leaderboard',
+        'schedule': 3600.0,
+    },
+    'flush-rating-offsets': {
+        'task': 'quiz_app.tasks.flush_rating_offsets',
+        'schedule': config('ADAPTIVE_OFFSET_FLUSH_INTERVAL', default=30, cast=float),
+    },
+}
+
+if TESTING:
+    CELERY_BROKER_URL = 'memory://'
+    CELERY_RESULT_BACKEND = 'cache+memory://'
+    CELERY_TASK_ALWAYS_EAGER = True
+    CELERY_TASK_EAGER_PROPAGATES = True
+
+# Leaderboard cache: 'local' (per process) or 'redis'
+LEADERBOARD_CACHE_BACKEND = config('LEADERBOARD_CACHE_BACKEND', default='local')
+LEADERBOARD_CACHE_REDIS_URL = config('REDIS_URL', default='redis://localhost:6379/0')
+LEADERBOARD_CACHE_TTL = config('LEADERBOARD_CACHE_TTL', default=60, cast=int)
+
+# Question search: 'auto' (by database), 'postgres', 'sqlite' (FTS5) or 'python'
+QUESTION_SEARCH_BACKEND = config('QUESTION_SEARCH_BACKEND', default='auto')
+QUESTION_SEARCH_TTL = config('QUESTION_SEARCH_TTL', default=300, cast=int)
+
+# Seconds before random-quiz question pools are reloaded
+QUESTION_POOL_TTL = config('QUESTION_POOL_TTL', default=300, cast=int)
+
+# Adaptive practice: seconds before question ratings are re-read for picking
+ADAPTIVE_INDEX_TTL = config('ADAPTIVE_INDEX_TTL', default=300, cast=int)
+# Queued question rating changes are written after this many seconds or
+# once this many questions have changes
+ADAPTIVE_OFFSET_FLUSH_INTERVAL = config('ADAPTIVE_OFFSET_FLUSH_INTERVAL', default=30, cast=float)
+ADAPTIVE_OFFSET_FLUSH_SIZE = config('ADAPTIVE_OFFSET_FLUSH_SIZE', default=500, cast=int)
+
+# Seconds a client is told to wait before polling a pending answer again
+ANSWER_POLL_INTERVAL = config('ANSWER_POLL_INTERVAL', default=1, cast=int)
+
+# Code grader
+GRADER_POOL_SIZE = config('GRADER_POOL_SIZE', default=2, cast=int)
+GRADER_MAX_PENDING = config('GRADER_MAX_PENDING', default=64, cast=int)
+GRADER_TEST_TIMEOUT = config('GRADER_TEST_TIMEOUT', default=2.0, cast=float)
+GRADER_CPU_SECONDS = config('GRADER_CPU_SECONDS', default=5, cast=int)
+GRADER_MEMORY_MB = config('GRADER_MEMORY_MB', default=256, cast=int)
+GRADER_QUEUE_TIMEOUT = config('GRADER_QUEUE_TIMEOUT', default=0.5, cast=float)
+GRADER_MAX_JOBS_PER_WORKER = config('GRADER_MAX_JOBS_PER_WORKER', default=500, cast=int)
+# Command prefix that jails each worker (e.g. "nsjail --config grader.cfg --")
+GRADER_SANDBOX_COMMAND = config('GRADER_SANDBOX_COMMAND', default='')
+# Refuse workers that could not drop network and filesystem access themselves
+GRADER_REQUIRE_ISOLATION = config('GRADER_REQUIRE_ISOLATION', default=not DEBUG, cast=bool)
 
 # Frontend URL
 FRONTEND_URL = config('FRONTEND_URL', default='http://localhost:3000')
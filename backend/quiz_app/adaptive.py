@@ -0,0 +1,259 @@
+"""
+Adaptive practice.
+
+Every user has an Elo skill rating per category (UserCategoryStats.rating)
+and every question a rating derived from its difficulty plus a learned
+offset (Question.rating_offset). The first grade of an answer (kept in
+Answer.rated_correct and rated_at) is scored like a match between the
+two: the user is expected to succeed with probability
+1 / (1 + 10 ** ((question - user) / 400)) and both ratings move by
+K * (result - expected), the user's up and the question's down on a
+success.
+
+User ratings are written with every grade. Question offset changes are
+accumulated in memory and flushed in one UPDATE every
+ADAPTIVE_OFFSET_FLUSH_INTERVAL seconds or ADAPTIVE_OFFSET_FLUSH_SIZE
+questions, so a popular question is not a row every grade contends on.
+Grades in between are scored against the last flushed offsets. Deltas
+lost with a process are restored by the next recompute.
+
+Practice questions are picked around the rating at which the user
+succeeds TARGET_SUCCESS of the time, from per-category (rating, id) lists
+sorted once and bisected for every pick. The lists are rebuilt when the
+catalog version changes, and after ADAPTIVE_INDEX_TTL seconds because
+question offsets drift with every grade.
+
+recompute_ratings() replays the first grades in order with the same
+updates, in batches: each batch is scored against the question offsets
+at its start and their changes are applied at its end, as a flush does.
+The replay is not vectorized: a user's update depends on the rating left
+by their previous answer, so answers are scored one after another within
+a batch, and numpy is not a dependency of this project.
+"""
+import bisect
+import itertools
+import math
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Value, When
+
+from . import catalog
+from .models import Answer, Question, UserCategoryStats
+
+# Base rating of each difficulty, the scale Question.rating_offset adjusts
+DIFFICULTY_RATINGS = {'easy': 1000.0, 'medium': 1200.0, 'hard': 1400.0}
+SCALE = 400.0
+USER_K = 32.0
+QUESTION_K = 8.0
+
+# Success probability practice questions are chosen for
+TARGET_SUCCESS = 0.7
+
+# Picks are sampled from this many times as many nearest questions
+CANDIDATE_FACTOR = 2
+
+ALL_CATEGORIES = ''
+
+
+def question_rating(difficulty, offset):
+    return DIFFICULTY_RATINGS.get(difficulty, UserCategoryStats.INITIAL_RATING) + offset
+
+
+def expected_success(user_rating, rating):
+    return 1 / (1 + 10 ** ((rating - user_rating) / SCALE))
+
+
+def rating_changes(user_rating, rating, is_correct):
+    """(user delta, question delta) of one graded attempt"""
+    surprise = int(is_correct) - expected_success(user_rating, rating)
+    return USER_K * surprise, -QUESTION_K * surprise
+
+
+def target_rating(skill):
+    """Question rating the user answers correctly TARGET_SUCCESS of the time"""
+    return skill - SCALE * math.log10(TARGET_SUCCESS / (1 - TARGET_SUCCESS))
+
+
+def record_result(stats, question, is_correct):
+    """
+    Apply a first grade to the user's category ``stats`` and ``question``
+    (which must have difficulty and rating_offset loaded). The question's
+    change is queued for flush_offsets() once the transaction commits.
+    """
+    user_delta, question_delta = rating_changes(
+        stats.rating, question_rating(question.difficulty, question.rating_offset), is_correct
+    )
+    UserCategoryStats.objects.filter(pk=stats.pk).update(rating=F('rating') + user_delta)
+    transaction.on_commit(lambda: _queue_offset(question.pk, question_delta))
+
+
+_pending_lock = threading.Lock()
+_pending_offsets = {}  # question id -> offset change not written yet
+_last_flush = time.monotonic()
+
+
+def _queue_offset(question_id, delta):
+    with _pending_lock:
+        _pending_offsets[question_id] = _pending_offsets.get(question_id, 0.0) + delta
+        due = (
+            len(_pending_offsets) >= settings.ADAPTIVE_OFFSET_FLUSH_SIZE
+            or time.monotonic() - _last_flush >= settings.ADAPTIVE_OFFSET_FLUSH_INTERVAL
+        )
+    if due:
+        flush_offsets()
+
+
+def apply_offsets(deltas, batch_size=500):
+    """Add ``deltas`` ({question id: change}) to the offsets, one UPDATE per batch"""
+    items = sorted(deltas.items())
+    for start in range(0, len(items), batch_size):
+        batch = items[start:start + batch_size]
+        # update() skips the catalog signals: ratings are not part of it
+        Question.objects.filter(pk__in=[pk for pk, _ in batch]).update(
+            rating_offset=F('rating_offset') + Case(
+                *[When(pk=pk, then=Value(delta)) for pk, delta in batch],
+                default=Value(0.0),
+                output_field=FloatField(),
+            )
+        )
+
+
+def flush_offsets():
+    """Write the queued question offset changes. Returns how many questions moved."""
+    global _pending_offsets, _last_flush
+    with _pending_lock:
+        pending, _pending_offsets = _pending_offsets, {}
+        _last_flush = time.monotonic()
+    if pending:
+        with transaction.atomic():
+            apply_offsets(pending)
+    return len(pending)
+
+
+_lock = threading.Lock()
+_index = None  # (catalog version, loaded at, {category: (ratings, ids)})
+
+
+def get_index():
+    global _index
+    version = catalog.catalog_version()
+    with _lock:
+        if (
+            _index is None or _index[0] != version
+            or time.monotonic() - _index[1] >= settings.ADAPTIVE_INDEX_TTL
+        ):
+            entries = {ALL_CATEGORIES: []}
+            rows = Question.objects.values_list('pk', 'category', 'difficulty', 'rating_offset')
+            for pk, category, difficulty, offset in rows.iterator():
+                entry = (question_rating(difficulty, offset), pk)
+                entries.setdefault(category, []).append(entry)
+                entries[ALL_CATEGORIES].append(entry)
+            index = {}
+            for category, category_entries in entries.items():
+                category_entries.sort()
+                index[category] = (
+                    [rating for rating, _ in category_entries],
+                    [pk for _, pk in category_entries],
+                )
+            _index = (version, time.monotonic(), index)
+        return _index[2]
+
+
+def nearest(ratings, ids, target, count, exclude=frozenset()):
+    """The ``count`` ids rated closest to ``target``, skipping ``exclude``"""
+    right = bisect.bisect_left(ratings, target)
+    left = right - 1
+    chosen = []
+    while len(chosen) < count and (left >= 0 or right < len(ids)):
+        if right >= len(ids) or (left >= 0 and target - ratings[left] <= ratings[right] - target):
+            pk, left = ids[left], left - 1
+        else:
+            pk, right = ids[right], right + 1
+        if pk not in exclude:
+            chosen.append(pk)
+    return chosen
+
+
+def next_questions(user, count, category=None, exclude=frozenset()):
+    """
+    Pick ``count`` practice questions for ``user``. Without a category the
+    user's weakest rated category is practised. Users without ratings
+    start from their preferred difficulty.
+    """
+    skills = dict(UserCategoryStats.objects.filter(user=user).values_list('category', 'rating'))
+    if category is None and skills:
+        category = min(skills, key=skills.get)
+    if category in skills:
+        skill = skills[category]
+    else:
+        preferred = getattr(getattr(user, 'profile', None), 'preferred_difficulty', None)
+        skill = DIFFICULTY_RATINGS.get(preferred, UserCategoryStats.INITIAL_RATING)
+
+    target = target_rating(skill)
+    ratings, ids = get_index().get(category or ALL_CATEGORIES, ([], []))
+    candidates = nearest(ratings, ids, target, count * CANDIDATE_FACTOR, exclude)
+    return {
+        'category': category,
+        'skill': skill,
+        'target_rating': target,
+        'question_ids': random.sample(candidates, min(count, len(candidates))),
+    }
+
+
+def recompute_ratings(batch_size=2000):
+    """
+    Rebuild every skill rating and question offset by replaying first
+    grades in order, ``batch_size`` at a time. Returns the number of
+    answers replayed.
+    """
+    skills = {}
+    offsets = {}
+    base_ratings = {
+        pk: question_rating(difficulty, 0.0)
+        for pk, difficulty in Question.objects.values_list('pk', 'difficulty')
+    }
+    rows = (
+        Answer.objects.filter(rated_correct__isnull=False)
+        .order_by('rated_at', 'pk')
+        .values_list('session__user_id', 'question__category', 'question_id', 'rated_correct')
+        .iterator(chunk_size=batch_size)
+    )
+    replayed = 0
+    while batch := list(itertools.islice(rows, batch_size)):
+        user_ids, categories, question_ids, results = zip(*batch)
+        # The whole batch is scored against the offsets at its start
+        ratings = [base_ratings[pk] + offsets.get(pk, 0.0) for pk in question_ids]
+        deltas = {}
+        for key, question_id, rating, result in zip(
+            zip(user_ids, categories), question_ids, ratings, results
+        ):
+            skill = skills.get(key, UserCategoryStats.INITIAL_RATING)
+            user_delta, question_delta = rating_changes(skill, rating, result)
+            skills[key] = skill + user_delta
+            deltas[question_id] = deltas.get(question_id, 0.0) + question_delta
+        for question_id, delta in deltas.items():
+            offsets[question_id] = offsets.get(question_id, 0.0) + delta
+        replayed += len(batch)
+
+    with _pending_lock:
+        # Queued changes were replayed above
+        _pending_offsets.clear()
+    with transaction.atomic():
+        UserCategoryStats.objects.update(rating=UserCategoryStats.INITIAL_RATING)
+        UserCategoryStats.objects.bulk_create(
+            [
+                UserCategoryStats(user_id=user_id, category=category, rating=rating)
+                for (user_id, category), rating in skills.items()
+            ],
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['user', 'category'],
+            update_fields=['rating'],
+        )
+        Question.objects.update(rating_offset=0.0)
+        apply_offsets(offsets)
+    return replayed
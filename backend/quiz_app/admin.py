@@ -1,7 +1,9 @@
 from django.contrib import admin
+
+from . import search
 from .models import (
     Question, Quiz, QuizSession, Answer, UserProfile,
-    Bookmark, Leaderboard, QuizQuestion
+    Bookmark, Leaderboard, QuizQuestion, DailyUserStats, UserCategoryStats
 )
 
 
@@ -9,8 +11,12 @@ from .models import (
 class QuestionAdmin(admin.ModelAdmin):
     list_display = ('title', 'difficulty', 'category', 'topic', 'solved_count')
     list_filter = ('difficulty', 'category', 'topic', 'created_at')
-    search_fields = ('title', 'description')
+    search_fields = ('title',)
     readonly_fields = ('created_at', 'updated_at')
+    
+    def get_search_results(self, request, queryset, search_term):
+        # description is stored as a blob; use the full-text index
+        return search.search_questions(queryset, search_term), False
 
 
 @admin.register(Quiz)
@@ -55,10 +61,24 @@ class BookmarkAdmin(admin.ModelAdmin):
 
 @admin.register(Leaderboard)
 class LeaderboardAdmin(admin.ModelAdmin):
-    list_display = ('user', 'rank', 'score', 'period')
+    list_display = ('user', 'score', 'period')
     list_filter = ('period',)
     search_fields = ('user__username',)
     readonly_fields = ('updated_at',)
 
 
+@admin.register(DailyUserStats)
+class DailyUserStatsAdmin(admin.ModelAdmin):
+    list_display = ('user', 'day', 'score', 'questions', 'correct_answers')
+    list_filter = ('day',)
+    search_fields = ('user__username',)
+
+
+@admin.register(UserCategoryStats)
+class UserCategoryStatsAdmin(admin.ModelAdmin):
+    list_display = ('user', 'category', 'attempted', 'correct')
+    list_filter = ('category',)
+    search_fields = ('user__username',)
+
+
 admin.site.register(QuizQuestion)
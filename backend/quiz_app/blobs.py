@@ -0,0 +1,138 @@
+"""
+Content-addressed text storage.
+
+Long text columns whose values repeat across rows (question descriptions,
+code and explanations, submitted code) store each distinct value once in
+ContentBlob, keyed by its SHA-256, and the rows keep only the digest.
+BlobTextField makes this transparent to models, forms and serializers:
+saving a row stores its blobs, and reading selects the text through a
+correlated primary-key subquery in the same SELECT, so no extra queries
+are made. Values of COMPRESS_MIN_SIZE bytes or more are zlib-compressed
+when that makes them smaller.
+
+Only exact, in and isnull lookups are supported on these columns (they
+compare digests) and ordering by them orders by digest; use
+quiz_app.search for text search. Writes that skip Field.pre_save
+(bulk_update, queryset.update) must call store() themselves. Blobs are
+immutable: prune() deletes the ones no row references any more.
+"""
+import contextlib
+import contextvars
+import hashlib
+import zlib
+from datetime import timedelta
+
+from django.apps import apps
+from django.db import models
+from django.db.models import CharField, ExpressionWrapper, F
+from django.utils import timezone
+
+# Values at least this long (in bytes) are compressed when it pays off
+COMPRESS_MIN_SIZE = 512
+
+# First byte of ContentBlob.data
+RAW = b'\x00'
+ZLIB = b'\x01'
+
+# Unreferenced blobs younger than this may belong to a row being saved
+PRUNE_GRACE = timedelta(days=1)
+
+# Digests stored by the enclosing stored() block
+_stored = contextvars.ContextVar('blobs_stored', default=frozenset())
+
+
+def digest(text):
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def encode(text):
+    data = text.encode()
+    if len(data) >= COMPRESS_MIN_SIZE:
+        compressed = zlib.compress(data)
+        if len(compressed) < len(data):
+            return ZLIB + compressed
+    return RAW + data
+
+
+def decode(data):
+    data = bytes(data)
+    if data[:1] == ZLIB:
+        return zlib.decompress(data[1:]).decode()
+    return data[1:].decode()
+
+
+def _blob_model():
+    return apps.get_model('quiz_app', 'ContentBlob')
+
+
+def store(texts):
+    """Store the distinct ``texts`` in one insert and return their digests"""
+    blobs = {digest(text): text for text in texts if text is not None}
+    if blobs:
+        ContentBlob = _blob_model()
+        ContentBlob.objects.bulk_create(
+            [ContentBlob(digest=key, data=encode(text)) for key, text in blobs.items()],
+            ignore_conflicts=True
+        )
+    return frozenset(blobs)
+
+
+@contextlib.contextmanager
+def stored(texts):
+    """Store ``texts`` up front; saves inside the block don't store them again"""
+    token = _stored.set(_stored.get() | store(texts))
+    try:
+        yield
+    finally:
+        _stored.reset(token)
+
+
+def blob_columns():
+    """(model, field name) of every BlobTextField"""
+    return [
+        (model, field.name)
+        for model in apps.get_app_config('quiz_app').get_models()
+        for field in model._meta.concrete_fields
+        if isinstance(field, BlobTextField)
+    ]
+
+
+def prune():
+    """Delete blobs no row references any more; returns the number deleted"""
+    unreferenced = _blob_model().objects.filter(created_at__lt=timezone.now() - PRUNE_GRACE)
+    for model, name in blob_columns():
+        # The wrapper selects the stored digest instead of the text
+        digests = model.objects.values(key=ExpressionWrapper(F(name), output_field=CharField()))
+        unreferenced = unreferenced.exclude(digest__in=digests)
+    return unreferenced.delete()[0]
+
+
+class BlobTextField(models.TextField):
+    description = 'Text stored once per distinct value in ContentBlob'
+
+    SUPPORTED_LOOKUPS = ('exact', 'in', 'isnull')
+
+    def pre_save(self, model_instance, add):
+        value = super().pre_save(model_instance, add)
+        if value is not None and digest(value) not in _stored.get():
+            store([value])
+        return value
+
+    def get_prep_value(self, value):
+        value = super().get_prep_value(value)
+        return None if value is None else digest(value)
+
+    def from_db_value(self, value, expression, connection):
+        return None if value is None else decode(value)
+
+    def select_format(self, compiler, sql, params):
+        quote = compiler.connection.ops.quote_name
+        return (
+            f'(SELECT {quote("blob")}.{quote("data")} FROM {quote(_blob_model()._meta.db_table)} '
+            f'{quote("blob")} WHERE {quote("blob")}.{quote("digest")} = {sql})'
+        ), params
+
+    def get_lookup(self, lookup_name):
+        if lookup_name not in self.SUPPORTED_LOOKUPS:
+            return None
+        return super().get_lookup(lookup_name)
@@ -0,0 +1,140 @@
+"""
+Read-mostly question catalog.
+
+Questions only change when admins edit them or the seed commands run, so
+serialized question pages and derived data (facet counts) are cached in
+the 'catalog' cache under a global catalog version. Question and quiz
+saves and deletes bump the version, which orphans every entry computed
+from the previous catalog; orphaned entries simply age out of the cache.
+Versions are the time of the change in nanoseconds, so the version alone
+also validates conditional requests (see catalog_fingerprint). Bumps made
+in another process only reach a per-process cache when its version
+expires after CATALOG_VERSION_TTL seconds and is renewed.
+The cache backend is chosen by CATALOG_CACHE_BACKEND.
+"""
+import hashlib
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count
+
+from . import search
+from .models import Question
+
+VERSION_KEY = 'catalog:version'
+
+# Dimensions the question browser filters and facets on
+FACETS = {
+    'topic': Question.TOPIC_CHOICES,
+    'category': Question.CATEGORY_CHOICES,
+    'difficulty': Question.DIFFICULTY_CHOICES,
+}
+
+
+def _cache():
+    return caches['catalog']
+
+
+def _version_timeout():
+    return settings.CATALOG_VERSION_TTL or None
+
+
+def catalog_version():
+    version = _cache().get(VERSION_KEY)
+    if version is None:
+        # A fresh start value so a cleared or expired version never
+        # reuses old keys
+        _cache().add(VERSION_KEY, time.time_ns(), timeout=_version_timeout())
+        version = _cache().get(VERSION_KEY)
+    return version
+
+
+def _bump():
+    # max() keeps versions increasing if the clock steps back
+    version = _cache().get(VERSION_KEY) or 0
+    _cache().set(VERSION_KEY, max(time.time_ns(), version + 1), timeout=_version_timeout())
+
+
+def bump_catalog_version():
+    """Invalidate everything cached for the current catalog"""
+    _bump()
+    # Readers may have cached the pre-commit state meanwhile
+    transaction.on_commit(_bump)
+
+
+def catalog_fingerprint():
+    """Conditional-request validators of the current catalog, without a query"""
+    version = catalog_version()
+    return {
+        'catalog': version,
+        'last_modified': datetime.fromtimestamp(version / 10 ** 9, tz=timezone.utc),
+    }
+
+
+def cached_response_data(request, namespace, build):
+    """
+    Serialized response data for ``request``, built by ``build()`` on a miss.
+    Keyed by the catalog version, ``namespace`` and the request's URL with
+    sorted query parameters (pagination links are absolute), so a page is
+    shared by every client asking for the same filters and page.
+    """
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    digest = hashlib.sha1(request.build_absolute_uri(f'?{query}').encode()).hexdigest()
+    key = f'catalog:{catalog_version()}:{namespace}:{digest}'
+    data = _cache().get(key)
+    if data is None:
+        data = build()
+        _cache().set(key, data)
+    return data
+
+
+def filters_from(params):
+    """The facet filters present in a request's query parameters"""
+    return {name: params[name] for name in FACETS if params.get(name)}
+
+
+def _facet_cells(text):
+    """(topic, category, difficulty, count) for questions matching ``text``"""
+    terms = ' '.join(search.tokenize(text))
+    key = f'catalog:{catalog_version()}:facets:{hashlib.sha1(terms.encode()).hexdigest()}'
+    cells = _cache().get(key)
+    if cells is None:
+        queryset = Question.objects.all()
+        if text:
+            queryset = search.search_questions(queryset, text)
+        cells = list(
+            queryset.order_by().values_list(*FACETS).annotate(count=Count('id'))
+        )
+        _cache().set(key, cells)
+    return cells
+
+
+def facet_counts(filters=None, text=''):
+    """
+    Question counts per topic, category and difficulty from one GROUP BY.
+
+    The count of each facet value applies every active filter except the
+    one on its own dimension, i.e. how many questions would match if that
+    value were selected instead. ``count`` is the number matching all
+    filters.
+    """
+    filters = filters or {}
+    facets = {
+        name: {value: {'name': label, 'count': 0} for value, label in choices}
+        for name, choices in FACETS.items()
+    }
+    total = 0
+    for *values, count in _facet_cells(text):
+        cell = dict(zip(FACETS, values))
+        mismatched = [name for name in filters if cell[name] != filters[name]]
+        if not mismatched:
+            total += count
+        for name, value in cell.items():
+            if not mismatched or mismatched == [name]:
+                entry = facets[name].setdefault(value, {'name': value, 'count': 0})
+                entry['count'] += count
+    return {'count': total, 'facets': facets}
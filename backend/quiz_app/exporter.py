@@ -0,0 +1,128 @@
+"""
+Streaming table exports.
+
+Rows are read in primary-key order in keyset batches (id > last id,
+LIMIT batch_size), each batch its own short query streamed with
+.iterator(), so exporting a multi-million-row table neither buffers it in
+memory nor holds one long-running cursor or snapshot open. Rows are
+written as JSONL or CSV as they arrive, gzip-compressed when the path
+ends in .gz. Every row carries its id: an interrupted export resumes
+with ``after_id`` and appends to the same file. Question exports use the
+importer's columns, so they can be loaded back with import_questions.
+"""
+import csv
+import json
+import os
+import time
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .importer import IMPORT_FIELDS, file_format, open_text
+from .models import Answer, Question, QuizSession
+
+# name -> (model, exported columns)
+EXPORTS = {
+    'questions': (Question, (
+        'id', *IMPORT_FIELDS, 'solved_count', 'avg_difficulty_rating', 'created_at', 'updated_at',
+    )),
+    'sessions': (QuizSession, (
+        'id', 'user_id', 'quiz_id', 'title', 'quiz_type', 'time_limit', 'status',
+        'total_score', 'total_questions', 'correct_answers', 'wrong_answers', 'accuracy',
+        'time_started', 'time_ended', 'time_spent', 'created_at', 'updated_at',
+    )),
+    'answers': (Answer, (
+        'id', 'session_id', 'question_id', 'user_code', 'is_correct', 'score', 'status',
+        'graded_at', 'feedback', 'test_results', 'submitted_at',
+    )),
+}
+
+# Lookup of the owning user, for per-user exports
+USER_LOOKUPS = {'sessions': 'user_id', 'answers': 'session__user_id'}
+
+
+class ExportStats:
+    def __init__(self, after_id=0):
+        self.rows = 0
+        self.last_id = after_id
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return (
+            f'{self.rows} rows in {self.seconds:.2f}s ({self.rows_per_second:.0f} rows/s), '
+            f'last id {self.last_id}'
+        )
+
+
+def iter_rows(queryset, fields, after_id=0, batch_size=2000):
+    """Yield ``fields`` dicts of ``queryset`` with id > ``after_id`` in id order"""
+    queryset = queryset.order_by('pk').values(*fields)
+    while True:
+        fetched = 0
+        for row in queryset.filter(pk__gt=after_id)[:batch_size].iterator(chunk_size=batch_size):
+            fetched += 1
+            after_id = row['id']
+            yield row
+        if fetched < batch_size:
+            return
+
+
+class _JsonlWriter:
+    def __init__(self, stream, fields, header):
+        self.stream = stream
+
+    def write(self, row):
+        self.stream.write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+
+
+class _CsvWriter:
+    def __init__(self, stream, fields, header):
+        self.writer = csv.DictWriter(stream, fields)
+        if header:
+            self.writer.writeheader()
+
+    def write(self, row):
+        self.writer.writerow({
+            # JSON columns are written as JSON, which the importer reads back
+            name: json.dumps(value) if isinstance(value, (dict, list)) else value
+            for name, value in row.items()
+        })
+
+
+WRITERS = {'jsonl': _JsonlWriter, 'csv': _CsvWriter}
+
+
+def export_rows(queryset, fields, path, format=None, after_id=0, batch_size=2000, stats=None):
+    """
+    Write ``queryset`` to ``path`` and return an ExportStats. With
+    ``after_id`` the file is appended to; ``stats.last_id`` is the last
+    row written even if the export is interrupted.
+    """
+    format = format or file_format(path)
+    if format not in WRITERS:
+        raise ValueError(f'Unsupported format: {format!r} (use jsonl or csv)')
+    stats = stats or ExportStats(after_id)
+    started = time.perf_counter()
+    appending = bool(after_id) and os.path.exists(path) and os.path.getsize(path) > 0
+    try:
+        with open_text(path, 'a' if appending else 'w') as stream:
+            writer = WRITERS[format](stream, fields, header=not appending)
+            for row in iter_rows(queryset, fields, after_id, batch_size):
+                writer.write(row)
+                stats.rows += 1
+                stats.last_id = row['id']
+    finally:
+        stats.seconds = time.perf_counter() - started
+    return stats
+
+
+def export_table(name, path, user_id=None, **options):
+    """Export one of EXPORTS, optionally only the rows of one user"""
+    model, fields = EXPORTS[name]
+    queryset = model.objects.all()
+    if user_id is not None:
+        queryset = queryset.filter(**{USER_LOOKUPS[name]: user_id})
+    return export_rows(queryset, fields, path, **options)
@@ -0,0 +1,445 @@
+"""
+Sandboxed execution of user submissions against Question.test_cases.
+
+User code never runs inside the web process. Each submission is handed, with
+all of its test cases, to one of a pool of warm worker processes which loads
+the function once and runs every case through it. Workers are separate
+interpreters running quiz_app/sandbox.py with an empty environment and no
+application code, isolated from the network and filesystem (see sandbox.py)
+and optionally wrapped in GRADER_SANDBOX_COMMAND. They run with CPU time,
+address space, file and process rlimits, a per-test-case alarm and a
+wall-clock deadline enforced by the parent (a worker that overruns it is
+killed and replaced).
+"""
+import ast
+import atexit
+import hashlib
+import json
+import math
+import os
+import queue
+import shlex
+import signal
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing.connection import Connection
+
+from django.conf import settings
+from django.core.cache import caches
+
+SANDBOX_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sandbox.py')
+
+# The whole environment of a worker: nothing is inherited from this process
+SANDBOX_ENV = {'LC_ALL': 'C.UTF-8'}
+
+# Seconds a new worker has to start and report in
+SPAWN_TIMEOUT = 10
+
+# Largest result message accepted from a worker
+MAX_RESULT_BYTES = 16 * 1024 * 1024
+
+
+class GraderError(Exception):
+    """Base class for grading engine errors"""
+
+
+class GraderBusy(GraderError):
+    """Raised when the submission queue is full"""
+
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def find_entry_point(code, template_code=''):
+    """
+    Return the name of the function to call in user code.
+    Prefers the function declared by the question template, then the first
+    top-level function of the submission. Raises SyntaxError for bad code.
+    """
+    tree = ast.parse(code)
+    defined = [node.name for node in tree.body if isinstance(node, ast.FunctionDef)]
+
+    try:
+        template = ast.parse(template_code or '')
+    except SyntaxError:
+        template = ast.Module(body=[], type_ignores=[])
+    for node in template.body:
+        if isinstance(node, ast.FunctionDef) and node.name in defined:
+            return node.name
+
+    return defined[0] if defined else None
+
+
+# ---------------------------------------------------------------------------
+# Web process side
+# ---------------------------------------------------------------------------
+
+class _WorkerTimeout(Exception):
+    pass
+
+
+class _Worker:
+    """One sandbox interpreter, talking JSON over a pair of pipes"""
+
+    def __init__(self, limits, command=()):
+        job_read, job_write = os.pipe()
+        result_read, result_write = os.pipe()
+        try:
+            self.process = subprocess.Popen(
+                [*command, sys.executable, '-I', '-S', SANDBOX_SCRIPT, json.dumps(limits)],
+                stdin=job_read, stdout=result_write, stderr=subprocess.DEVNULL,
+                env=SANDBOX_ENV, cwd='/', close_fds=True, start_new_session=True,
+            )
+        except OSError:
+            os.close(job_write)
+            os.close(result_read)
+            raise
+        finally:
+            os.close(job_read)
+            os.close(result_write)
+        self.jobs_conn = Connection(job_write, readable=False)
+        self.results_conn = Connection(result_read, writable=False)
+        self.jobs = 0
+        try:
+            self.isolated = self._receive(SPAWN_TIMEOUT)['isolated']
+        except (_WorkerTimeout, EOFError, OSError, ValueError):
+            self.kill()
+            raise GraderError('Grading worker failed to start')
+
+    def _receive(self, timeout):
+        if not self.results_conn.poll(timeout):
+            raise _WorkerTimeout()
+        return json.loads(self.results_conn.recv_bytes(MAX_RESULT_BYTES))
+
+    def run(self, job, deadline):
+        self.jobs_conn.send_bytes(json.dumps(job).encode())
+        result = self._receive(deadline)
+        self.jobs += 1
+        return result
+
+    def stop(self):
+        try:
+            self.jobs_conn.send_bytes(b'null')
+        except OSError:
+            pass
+        self.kill()
+
+    def kill(self):
+        # The worker leads its own process group; take anything it started too
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+        try:
+            self.process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            pass
+        self.jobs_conn.close()
+        self.results_conn.close()
+
+
+class GraderMetrics:
+    """Thread-safe counters describing grading throughput"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.monotonic()
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.crashes = 0
+        self.recycled = 0
+        self.in_flight = 0
+        self.busy_seconds = 0.0
+        self.wait_seconds = 0.0
+
+    def incr(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def avg_run_seconds(self):
+        with self._lock:
+            return self.busy_seconds / self.completed if self.completed else 0.0
+
+    def snapshot(self):
+        with self._lock:
+            uptime = time.monotonic() - self.started_at
+            return {
+                'uptime_seconds': round(uptime, 3),
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'timeouts': self.timeouts,
+                'crashes': self.crashes,
+                'recycled': self.recycled,
+                'in_flight': self.in_flight,
+                'throughput_per_second': round(self.completed / uptime, 3) if uptime else 0.0,
+                'avg_run_ms': round(self.busy_seconds / self.completed * 1000, 3) if self.completed else 0.0,
+                'avg_wait_ms': round(self.wait_seconds / self.completed * 1000, 3) if self.completed else 0.0,
+            }
+
+
+class GraderPool:
+    """
+    Fixed-size pool of warm sandboxed grading workers.
+
+    At most ``size`` jobs run at once and at most ``max_pending`` more may
+    wait for a worker. A caller that finds the queue full waits up to
+    ``queue_timeout`` seconds for room and then gets GraderBusy, whose
+    ``retry_after`` tells the client when to come back. Workers are
+    replaced after ``max_jobs`` jobs (jobs themselves run in a fresh fork,
+    so a worker does not grow with them) and after a timeout or crash. A
+    worker that could not be replaced is spawned again by the next job.
+    Workers start under ``command`` (an external jail) when given; with
+    ``require_isolation`` and no command, a worker that could not isolate
+    itself is refused.
+    """
+
+    def __init__(self, size, max_pending, limits, max_jobs=0,
+                 queue_timeout=0.0, command=(), require_isolation=False):
+        self.command = tuple(command)
+        self.require_isolation = require_isolation
+        self.size = size
+        self.capacity = size + max_pending
+        self.limits = limits
+        self.max_jobs = max_jobs
+        self.queue_timeout = queue_timeout
+        self.metrics = GraderMetrics()
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._missing = 0  # workers retired without a replacement
+        for _ in range(size):
+            self._idle.put(self._spawn())
+
+    def _spawn(self):
+        try:
+            worker = _Worker(self.limits, self.command)
+        except OSError as e:
+            raise GraderError(f'Grading worker failed to start: {e}') from e
+        if self.require_isolation and not (worker.isolated or self.command):
+            worker.kill()
+            raise GraderError(
+                'Grading workers cannot isolate themselves here; '
+                'set GRADER_SANDBOX_COMMAND to run them in a jail'
+            )
+        return worker
+
+    def _checkout(self):
+        with self._lock:
+            respawn = self._missing > 0
+            if respawn:
+                self._missing -= 1
+        if not respawn:
+            return self._idle.get()
+        try:
+            return self._spawn()
+        except GraderError:
+            with self._lock:
+                self._missing += 1
+            raise
+
+    def _replace(self, worker, stop=False):
+        """Retire ``worker``; it is never handed out again"""
+        if stop:
+            worker.stop()
+        else:
+            worker.kill()
+        try:
+            self._idle.put(self._spawn())
+        except GraderError:
+            # The job's own outcome stands; the next checkout tries again
+            with self._lock:
+                self._missing += 1
+
+    def retry_after(self):
+        """Seconds until the current backlog is expected to drain"""
+        backlog = self.metrics.in_flight / self.size
+        return max(1, math.ceil(backlog * self.metrics.avg_run_seconds()))
+
+    def run(self, job, deadline):
+        if self.queue_timeout:
+            acquired = self._slots.acquire(timeout=self.queue_timeout)
+        else:
+            acquired = self._slots.acquire(blocking=False)
+        if not acquired:
+            self.metrics.incr(rejected=1)
+            raise GraderBusy('Grading queue is full, try again shortly', self.retry_after())
+
+        self.metrics.incr(submitted=1, in_flight=1)
+        queued_at = time.monotonic()
+        try:
+            worker = self._checkout()
+            started = time.monotonic()
+            try:
+                result = worker.run(job, deadline)
+            except _WorkerTimeout:
+                self.metrics.incr(timeouts=1)
+                self._replace(worker)
+                return None
+            except (EOFError, OSError, ValueError):
+                # The worker was killed by an rlimit (e.g. hard CPU limit)
+                self.metrics.incr(crashes=1)
+                self._replace(worker)
+                return None
+            # Only finished jobs count towards throughput and run times
+            self.metrics.incr(
+                completed=1,
+                busy_seconds=time.monotonic() - started,
+                wait_seconds=started - queued_at,
+            )
+            if self.max_jobs and worker.jobs >= self.max_jobs:
+                self.metrics.incr(recycled=1)
+                self._replace(worker, stop=True)
+            else:
+                self._idle.put(worker)
+            return result
+        finally:
+            self.metrics.incr(in_flight=-1)
+            self._slots.release()
+
+    def stats(self):
+        stats = self.metrics.snapshot()
+        stats.update({
+            'pool_size': self.size,
+            'capacity': self.capacity,
+            'idle_workers': self._idle.qsize(),
+            'saturated': stats['in_flight'] >= self.capacity,
+        })
+        return stats
+
+    def shutdown(self):
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            worker.stop()
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide pool, starting its workers on first use"""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = GraderPool(
+                size=settings.GRADER_POOL_SIZE,
+                max_pending=settings.GRADER_MAX_PENDING,
+                limits={'memory_mb': settings.GRADER_MEMORY_MB},
+                max_jobs=settings.GRADER_MAX_JOBS_PER_WORKER,
+                queue_timeout=settings.GRADER_QUEUE_TIMEOUT,
+                command=shlex.split(settings.GRADER_SANDBOX_COMMAND),
+                require_isolation=settings.GRADER_REQUIRE_ISOLATION,
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+@atexit.register
+def _shutdown_pool():
+    if _pool is not None and _pool_pid == os.getpid():
+        _pool.shutdown()
+
+
+def grade_submission(code, test_cases, template_code='', timeout=None):
+    """
+    Run ``code`` against every test case and return a summary dict:
+    ``{'passed': int, 'total': int, 'all_passed': bool, 'error': str|None,
+    'time_ms': float, 'cases': [...]}`` where ``cases`` is in test case
+    order. Raises GraderBusy when the queue is saturated.
+    """
+    timeout = timeout or settings.GRADER_TEST_TIMEOUT
+    summary = {
+        'passed': 0, 'total': len(test_cases), 'all_passed': False,
+        'error': None, 'time_ms': 0.0, 'cases': [],
+    }
+
+    try:
+        entry_point = find_entry_point(code, template_code)
+    except SyntaxError as exc:
+        summary['error'] = f'SyntaxError: {exc.msg} (line {exc.lineno})'
+        return summary
+    if entry_point is None:
+        summary['error'] = 'No function definition found in submission'
+        return summary
+
+    job = {
+        'code': code,
+        'entry_point': entry_point,
+        'cases': test_cases,
+        'timeout': timeout,
+        'cpu_seconds': settings.GRADER_CPU_SECONDS,
+    }
+    # One round trip for the whole submission; the deadline covers the
+    # module load plus every case running up to its own timeout.
+    batch = get_pool().run(job, deadline=timeout * (len(test_cases) + 1) + 1)
+    if batch is None:
+        batch = {'error': 'Time limit exceeded', 'cases': []}
+
+    summary['error'] = batch['error']
+    summary['cases'] = batch['cases']
+    summary['passed'] = sum(1 for result in batch['cases'] if result['passed'])
+    summary['all_passed'] = bool(test_cases) and summary['passed'] == summary['total']
+    summary['time_ms'] = round(sum(result['time_ms'] for result in batch['cases']), 3)
+    return summary
+
+
+# ---------------------------------------------------------------------------
+# Result cache
+# ---------------------------------------------------------------------------
+
+def normalize_code(code):
+    """
+    Canonical form of a submission: the AST dump, so formatting and
+    comments do not matter. Unparseable code falls back to its stripped lines.
+    """
+    try:
+        return ast.dump(ast.parse(code))
+    except SyntaxError:
+        return '\n'.join(line.rstrip() for line in code.strip().splitlines() if line.strip())
+
+
+def test_cases_version(question):
+    """Digest of everything on the question that affects grading"""
+    payload = json.dumps([question.test_cases, question.template_code], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def grading_cache_key(question, code):
+    code_hash = hashlib.sha256(normalize_code(code).encode()).hexdigest()
+    return f'grade:{question.pk}:{test_cases_version(question)}:{code_hash}'
+
+
+def _is_cacheable(summary):
+    # Errors and failed cases can come from the machine (load, limits) or
+    # from the submission's own randomness, so only clean passes are reused
+    if summary['error'] or not summary['all_passed']:
+        return False
+    return not any(case['error'] for case in summary['cases'])
+
+
+def grade_question(question, code):
+    """
+    Grade ``code`` against a Question, reusing the result of an identical
+    earlier submission that passed every case. Results live in the ``grading`` cache (LRU + TTL);
+    entries for old test cases become unreachable as soon as the question's
+    test_cases or template change, since both are part of the key.
+    """
+    cache = caches['grading']
+    key = grading_cache_key(question, code)
+    summary = cache.get(key)
+    if summary is None:
+        summary = grade_submission(code, question.test_cases, question.template_code)
+        if _is_cacheable(summary):
+            cache.set(key, summary)
+    return summary
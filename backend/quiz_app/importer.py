@@ -0,0 +1,263 @@
+"""
+Bulk question import.
+
+Rows are streamed from JSON (a top-level array), JSONL or CSV files,
+optionally gzip-compressed, validated, deduplicated on (title, topic)
+against the keys already in the database and written with
+bulk_create/bulk_update in batches inside one transaction. Bulk writes
+bypass model signals, so every batch is pushed to the search index and
+the catalog version is bumped at the end.
+"""
+import csv
+import gzip
+import json
+import os
+import time
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import blobs, catalog, search
+from .models import Question
+
+# Fields an import row may set; the first five are required
+IMPORT_FIELDS = (
+    'title', 'description', 'topic', 'category', 'difficulty',
+    'template_code', 'solution_code', 'explanation', 'video_url', 'test_cases',
+)
+REQUIRED_FIELDS = IMPORT_FIELDS[:5]
+BLOB_FIELDS = [
+    name for name in IMPORT_FIELDS
+    if isinstance(Question._meta.get_field(name), blobs.BlobTextField)
+]
+MAX_LENGTHS = {
+    name: Question._meta.get_field(name).max_length
+    for name in IMPORT_FIELDS
+    if Question._meta.get_field(name).max_length
+}
+CHOICES = {
+    'topic': {value for value, _ in Question.TOPIC_CHOICES},
+    'category': {value for value, _ in Question.CATEGORY_CHOICES},
+    'difficulty': {value for value, _ in Question.DIFFICULTY_CHOICES},
+}
+
+# Validation errors kept for the report
+MAX_REPORTED_ERRORS = 20
+
+
+class QuestionImportError(Exception):
+    pass
+
+
+class ImportStats:
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.errors = []
+        self.seconds = 0.0
+
+    @property
+    def rows(self):
+        return self.created + self.updated + self.duplicates + self.invalid
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return (
+            f'{self.rows} rows in {self.seconds:.2f}s ({self.rows_per_second:.0f} rows/s): '
+            f'{self.created} created, {self.updated} updated, '
+            f'{self.duplicates} duplicates skipped, {self.invalid} invalid'
+        )
+
+
+def _iter_json_array(stream, chunk_size=1 << 16):
+    """Decode the objects of a top-level JSON array without loading the file"""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    started = False
+    eof = False
+    while True:
+        buffer = buffer.lstrip()
+        if not started:
+            if buffer.startswith('['):
+                buffer = buffer[1:]
+                started = True
+                continue
+        elif buffer.startswith(','):
+            buffer = buffer[1:]
+            continue
+        elif buffer.startswith(']'):
+            return
+        elif buffer:
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise QuestionImportError('Malformed JSON array')
+            else:
+                yield item
+                buffer = buffer[end:]
+                continue
+        if eof:
+            if not started:
+                raise QuestionImportError('Expected a JSON array of questions')
+            raise QuestionImportError('Unterminated JSON array')
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        buffer += chunk
+
+
+def _iter_csv(stream):
+    for row in csv.DictReader(stream):
+        if row.get('test_cases'):
+            try:
+                row['test_cases'] = json.loads(row['test_cases'])
+            except json.JSONDecodeError:
+                pass  # Reported by validation as not being a list
+        yield row
+
+
+def file_format(path):
+    """'json', 'jsonl' or 'csv' from a path such as questions.jsonl.gz"""
+    if path.endswith('.gz'):
+        path = path[:-3]
+    return os.path.splitext(path)[1].lstrip('.').lower()
+
+
+def open_text(path, mode='r'):
+    """Open a text file, gzip-compressed when the path ends in .gz"""
+    if path.endswith('.gz'):
+        return gzip.open(path, f'{mode}t', encoding='utf-8', newline='')
+    return open(path, mode, encoding='utf-8', newline='')
+
+
+def read_rows(path, format=None):
+    """Stream question dicts from a .json, .jsonl or .csv file (optionally .gz)"""
+    format = format or file_format(path)
+    with open_text(path) as stream:
+        if format == 'json':
+            yield from _iter_json_array(stream)
+        elif format == 'jsonl':
+            for line in stream:
+                if line.strip():
+                    yield json.loads(line)
+        elif format == 'csv':
+            yield from _iter_csv(stream)
+        else:
+            raise QuestionImportError(f'Unsupported format: {format!r} (use json, jsonl or csv)')
+
+
+def check_types(fields):
+    """Raise QuestionImportError unless test_cases is a list of objects and the rest are strings"""
+    for name, value in fields.items():
+        if name == 'test_cases':
+            if not isinstance(value, list) or not all(isinstance(case, dict) for case in value):
+                raise QuestionImportError('test_cases must be a list of objects')
+        elif not isinstance(value, str):
+            raise QuestionImportError(f'{name} must be a string')
+
+
+def validate_row(row, strict_choices=True):
+    """Return ``(fields, None)`` for a valid row or ``(None, error)``"""
+    if not isinstance(row, dict):
+        return None, 'row is not an object'
+    fields = {name: row[name] for name in IMPORT_FIELDS if row.get(name) not in (None, '')}
+    try:
+        check_types(fields)
+    except QuestionImportError as exc:
+        return None, str(exc)
+    missing = [name for name in REQUIRED_FIELDS if not str(fields.get(name, '')).strip()]
+    if missing:
+        return None, f'missing {", ".join(missing)}'
+    for name, max_length in MAX_LENGTHS.items():
+        if name in fields and len(str(fields[name])) > max_length:
+            return None, f'{name} longer than {max_length} characters'
+    checked = CHOICES if strict_choices else {'difficulty': CHOICES['difficulty']}
+    for name, allowed in checked.items():
+        if fields[name] not in allowed:
+            return None, f'unknown {name} {fields[name]!r}'
+    for name in ('template_code', 'solution_code', 'explanation'):
+        fields.setdefault(name, '')
+    fields.setdefault('video_url', None)
+    fields.setdefault('test_cases', [])
+    return fields, None
+
+
+def import_questions(rows, batch_size=1000, update_existing=False, strict_choices=True):
+    """
+    Import question dicts from any iterable and return an ImportStats.
+
+    A row whose (title, topic) already exists, in the database or earlier
+    in the input, is skipped; with ``update_existing`` the first such row
+    replaces the content of the stored question instead.
+    """
+    stats = ImportStats()
+    started = time.perf_counter()
+    to_create, to_update = [], []
+    unindexed = False
+
+    def flush():
+        nonlocal unindexed
+        questions = to_create + to_update
+        # One insert for the distinct texts of the batch
+        with blobs.stored(getattr(question, name) for question in questions for name in BLOB_FIELDS):
+            Question.objects.bulk_create(to_create)
+            if to_update:
+                # bulk_update() skips auto_now
+                now = timezone.now()
+                for question in to_update:
+                    question.updated_at = now
+                Question.objects.bulk_update(to_update, [*IMPORT_FIELDS, 'updated_at'])
+        ids = [question.pk for question in questions]
+        if None in ids:
+            # The database does not return primary keys from bulk inserts
+            unindexed = True
+        else:
+            search.reindex(ids)
+        to_create.clear()
+        to_update.clear()
+
+    with transaction.atomic():
+        # (title, topic) -> pk of stored questions, None once handled here
+        keys = {
+            (title, topic): pk
+            for pk, title, topic in Question.objects.values_list('pk', 'title', 'topic').iterator()
+        }
+        for number, row in enumerate(rows, start=1):
+            fields, error = validate_row(row, strict_choices)
+            if error:
+                stats.invalid += 1
+                if len(stats.errors) < MAX_REPORTED_ERRORS:
+                    stats.errors.append(f'row {number}: {error}')
+                continue
+
+            key = (fields['title'], fields['topic'])
+            if key not in keys:
+                to_create.append(Question(**fields))
+                stats.created += 1
+            elif update_existing and keys[key] is not None:
+                to_update.append(Question(pk=keys[key], **fields))
+                stats.updated += 1
+            else:
+                stats.duplicates += 1
+                continue
+            keys[key] = None
+
+            if len(to_create) + len(to_update) >= batch_size:
+                flush()
+        flush()
+
+        if unindexed:
+            search.rebuild()
+        catalog.bump_catalog_version()
+
+    stats.seconds = time.perf_counter() - started
+    return stats
+
+
+def import_file(path, format=None, **options):
+    return import_questions(read_rows(path, format), **options)
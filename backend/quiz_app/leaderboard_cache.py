@@ -0,0 +1,316 @@
+"""
+Ranked leaderboard cache.
+
+Each period is kept as a sorted set of user scores plus the serialized
+entry of every user, so top-K, a page at any offset and a single user's
+rank are answered without touching the database. Ranks are competition
+ranks (1 + number of strictly higher scores), as in utils.ranked_leaderboard.
+
+Two backends share one interface: a process-local one (the default, also
+used by the tests) and a Redis one for deployments with several web
+processes. Leaderboard writers push changes through write_entries /
+remove_entry; a full refresh calls invalidate so the next read reloads
+the period from the database. Local periods are also reloaded after
+LEADERBOARD_CACHE_TTL seconds to pick up writes made by other processes.
+
+Every load, write and removal also bumps a per-period version, which
+validates conditional leaderboard reads without a query. Local versions
+carry a per-process token, so two processes never share a version for
+different contents.
+"""
+import json
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from sortedcontainers import SortedList
+
+from .models import Leaderboard
+from .serializers import LeaderboardSerializer
+
+
+class _SortedSet:
+    """
+    Scores ordered high to low, ties broken by user id. Backed by a
+    SortedList, so adds, removes, positions and slices are O(log n)
+    rather than the O(n) of inserting into a plain list.
+    """
+
+    def __init__(self):
+        self.scores = {}
+        self.order = SortedList()
+
+    def add(self, user_id, score):
+        self.remove(user_id)
+        self.scores[user_id] = score
+        self.order.add((-score, user_id))
+
+    def remove(self, user_id):
+        score = self.scores.pop(user_id, None)
+        if score is not None:
+            self.order.remove((-score, user_id))
+
+    def higher_count(self, score):
+        return self.order.bisect_left((-score, float('-inf')))
+
+    def position(self, user_id):
+        return self.order.index((-self.scores[user_id], user_id))
+
+    def slice(self, start, stop):
+        return [(user_id, -neg_score) for neg_score, user_id in self.order[start:stop]]
+
+
+class LocalLeaderboardBackend:
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._sets = {}
+        self._payloads = {}
+        self._loaded_at = {}
+        self._token = uuid.uuid4().hex
+        self._versions = {}
+
+    def is_loaded(self, period):
+        loaded_at = self._loaded_at.get(period)
+        return loaded_at is not None and time.monotonic() - loaded_at < self.ttl
+
+    def load(self, period, payloads):
+        sorted_set = _SortedSet()
+        for payload in payloads.values():
+            sorted_set.add(payload['user']['id'], payload['score'])
+        with self._lock:
+            self._sets[period] = sorted_set
+            self._payloads[period] = payloads
+            self._loaded_at[period] = time.monotonic()
+            self._versions[period] = self._versions.get(period, 0) + 1
+
+    def invalidate(self, period):
+        with self._lock:
+            self._loaded_at.pop(period, None)
+
+    def write(self, period, payloads):
+        with self._lock:
+            if period not in self._sets:
+                return
+            for user_id, payload in payloads.items():
+                self._sets[period].add(user_id, payload['score'])
+                self._payloads[period][user_id] = payload
+            self._versions[period] += 1
+
+    def remove(self, period, user_id):
+        with self._lock:
+            if period in self._sets:
+                self._sets[period].remove(user_id)
+                self._payloads[period].pop(user_id, None)
+                self._versions[period] += 1
+
+    def version(self, period):
+        return f'{self._token}:{self._versions.get(period, 0)}'
+
+    def count(self, period):
+        return len(self._sets[period].scores)
+
+    def range(self, period, start, stop):
+        with self._lock:
+            rows = self._sets[period].slice(start, stop)
+            first_rank = self._sets[period].higher_count(rows[0][1]) + 1 if rows else 1
+            return first_rank, [(score, self._payloads[period][user_id]) for user_id, score in rows]
+
+    def position(self, period, user_id):
+        with self._lock:
+            if user_id not in self._sets[period].scores:
+                return None
+            return self._sets[period].position(user_id)
+
+
+class RedisLeaderboardBackend:
+    """Sorted set per period in Redis (ZADD/ZREVRANGE/ZCOUNT are O(log n))"""
+
+    def __init__(self, client, ttl, prefix='leaderboard'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _keys(self, period):
+        base = f'{self.prefix}:{period}'
+        return f'{base}:scores', f'{base}:entries', f'{base}:loaded', f'{base}:version'
+
+    def is_loaded(self, period):
+        return bool(self.client.exists(self._keys(period)[2]))
+
+    def load(self, period, payloads):
+        scores_key, entries_key, loaded_key, version_key = self._keys(period)
+        pipe = self.client.pipeline()
+        pipe.delete(scores_key, entries_key)
+        if payloads:
+            pipe.zadd(scores_key, {user_id: payload['score'] for user_id, payload in payloads.items()})
+            pipe.hset(entries_key, mapping={
+                user_id: json.dumps(payload) for user_id, payload in payloads.items()
+            })
+        pipe.set(loaded_key, 1, ex=self.ttl)
+        pipe.incr(version_key)
+        pipe.execute()
+
+    def invalidate(self, period):
+        self.client.delete(self._keys(period)[2])
+
+    def write(self, period, payloads):
+        if not payloads or not self.is_loaded(period):
+            return
+        scores_key, entries_key, _, version_key = self._keys(period)
+        pipe = self.client.pipeline()
+        pipe.zadd(scores_key, {user_id: payload['score'] for user_id, payload in payloads.items()})
+        pipe.hset(entries_key, mapping={
+            user_id: json.dumps(payload) for user_id, payload in payloads.items()
+        })
+        pipe.incr(version_key)
+        pipe.execute()
+
+    def remove(self, period, user_id):
+        scores_key, entries_key, _, version_key = self._keys(period)
+        pipe = self.client.pipeline()
+        pipe.zrem(scores_key, user_id)
+        pipe.hdel(entries_key, user_id)
+        pipe.incr(version_key)
+        pipe.execute()
+
+    def version(self, period):
+        return int(self.client.get(self._keys(period)[3]) or 0)
+
+    def count(self, period):
+        return self.client.zcard(self._keys(period)[0])
+
+    def range(self, period, start, stop):
+        scores_key, entries_key = self._keys(period)[:2]
+        rows = self.client.zrevrange(scores_key, start, stop - 1, withscores=True)
+        if not rows:
+            return 1, []
+        first_rank = self.client.zcount(scores_key, f'({rows[0][1]}', '+inf') + 1
+        payloads = self.client.hmget(entries_key, [user_id for user_id, _ in rows])
+        return first_rank, [
+            (score, json.loads(payload) if payload else None)
+            for (_, score), payload in zip(rows, payloads)
+        ]
+
+    def position(self, period, user_id):
+        return self.client.zrevrank(self._keys(period)[0], user_id)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            ttl = settings.LEADERBOARD_CACHE_TTL
+            if settings.LEADERBOARD_CACHE_BACKEND == 'redis':
+                import redis
+                client = redis.Redis.from_url(settings.LEADERBOARD_CACHE_REDIS_URL)
+                _backend = RedisLeaderboardBackend(client, ttl)
+            else:
+                _backend = LocalLeaderboardBackend(ttl)
+        return _backend
+
+
+def _ensure_loaded(period):
+    backend = get_backend()
+    if not backend.is_loaded(period):
+        entries = Leaderboard.objects.filter(period=period).select_related('user')
+        backend.load(period, {
+            entry.user_id: LeaderboardSerializer(entry).data for entry in entries
+        })
+    return backend
+
+
+def _with_ranks(first_rank, offset, entries):
+    """
+    Assign competition ranks to a run of (score, payload) sorted by score.
+    Ranks follow the positions in the sorted set; entries whose payload is
+    missing are dropped only afterwards, so they cannot shift the others.
+    """
+    rows = []
+    rank = first_rank
+    for index, (score, payload) in enumerate(entries):
+        if index and score != entries[index - 1][0]:
+            rank = offset + index + 1
+        if payload is not None:
+            rows.append(dict(payload, rank=rank))
+    return rows
+
+
+def page(period, offset, limit):
+    """Return ``(total_count, rows)`` for ``limit`` entries from ``offset``"""
+    backend = _ensure_loaded(period)
+    first_rank, entries = backend.range(period, offset, offset + limit)
+    return backend.count(period), _with_ranks(first_rank, offset, entries)
+
+
+class RankedPeriod:
+    """
+    Lazy sequence over a cached period, so the regular DRF paginators can
+    page it: only the requested slice is read from the cache.
+    """
+
+    def __init__(self, period):
+        self.period = period
+
+    def count(self):
+        return _ensure_loaded(self.period).count(self.period)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            raise TypeError('RankedPeriod only supports slicing')
+        start = index.start or 0
+        stop = self.count() if index.stop is None else index.stop
+        return page(self.period, start, max(stop - start, 0))[1]
+
+
+def version(period):
+    """Changes whenever the cached period does; loads it first if needed"""
+    return _ensure_loaded(period).version(period)
+
+
+def top(period, k):
+    return page(period, 0, k)[1]
+
+
+def around(period, user_id, radius):
+    """The user's entry with up to ``radius`` neighbours on each side"""
+    backend = _ensure_loaded(period)
+    position = backend.position(period, user_id)
+    if position is None:
+        return None, []
+    offset = max(position - radius, 0)
+    first_rank, entries = backend.range(period, offset, position + radius + 1)
+    rows = _with_ranks(first_rank, offset, entries)
+    mine = next((row for row in rows if row['user']['id'] == user_id), None)
+    return mine, rows
+
+
+def write_entries(entries):
+    """Write-through for Leaderboard rows that were created or updated"""
+    if not entries:
+        return
+    users = User.objects.in_bulk({entry.user_id for entry in entries})
+    by_period = {}
+    for entry in entries:
+        entry.user = users[entry.user_id]
+        by_period.setdefault(entry.period, {})[entry.user_id] = LeaderboardSerializer(entry).data
+    backend = get_backend()
+    for period, payloads in by_period.items():
+        backend.write(period, payloads)
+
+
+def remove_entry(period, user_id):
+    get_backend().remove(period, user_id)
+
+
+def invalidate(period):
+    get_backend().invalidate(period)
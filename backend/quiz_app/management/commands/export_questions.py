@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from quiz_app.exporter import ExportStats, export_table
+
+
+class Command(BaseCommand):
+    help = 'Stream the question bank to a JSONL or CSV file (gzip-compressed for .gz paths)'
+    table = 'questions'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='e.g. questions.jsonl.gz or questions.csv.gz')
+        parser.add_argument('--format', choices=['jsonl', 'csv'],
+                            help='File format (default: from the file extension)')
+        parser.add_argument('--after-id', type=int, default=0,
+                            help='Resume after this id, appending to the file')
+        parser.add_argument('--batch-size', type=int, default=2000)
+    
+    def get_table(self, options):
+        return self.table
+    
+    def handle(self, *args, **options):
+        table = self.get_table(options)
+        self.stdout.write(f"\n📤 Exporting {table} to {options['path']}...")
+        
+        stats = ExportStats(options['after_id'])
+        try:
+            export_table(
+                table,
+                options['path'],
+                user_id=options.get('user_id'),
+                format=options['format'],
+                after_id=options['after_id'],
+                batch_size=options['batch_size'],
+                stats=stats,
+            )
+        except KeyboardInterrupt:
+            raise CommandError(
+                f"Interrupted after {stats.rows} rows; resume with --after-id {stats.last_id}"
+            )
+        except (OSError, ValueError) as exc:
+            resume = f"; resume with --after-id {stats.last_id}" if stats.rows else ""
+            raise CommandError(f"Export failed: {exc}{resume}")
+        
+        self.stdout.write(self.style.SUCCESS(f"✅ {stats}"))
@@ -0,0 +1,15 @@
+from quiz_app.management.commands.export_questions import Command as ExportCommand
+
+
+class Command(ExportCommand):
+    help = 'Stream quiz sessions (or, with --answers, their answers) to a JSONL or CSV file'
+    
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--answers', action='store_true',
+                            help='Export the answers of the sessions instead')
+        parser.add_argument('--user', type=int, dest='user_id',
+                            help='Only export this user id')
+    
+    def get_table(self, options):
+        return 'answers' if options['answers'] else 'sessions'
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from quiz_app.importer import QuestionImportError, import_file
+
+
+class Command(BaseCommand):
+    help = 'Bulk import questions from a JSON, JSONL or CSV file (e.g. sample_questions.json)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['json', 'jsonl', 'csv'],
+                            help='File format (default: from the file extension)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--update', action='store_true',
+                            help='Overwrite questions that already exist instead of skipping them')
+        parser.add_argument('--allow-unknown-choices', action='store_true',
+                            help='Accept topic/category values outside the model choices')
+    
+    def handle(self, *args, **options):
+        self.stdout.write(f"\n📥 Importing questions from {options['path']}...")
+        
+        try:
+            stats = import_file(
+                options['path'],
+                format=options['format'],
+                batch_size=options['batch_size'],
+                update_existing=options['update'],
+                strict_choices=not options['allow_unknown_choices'],
+            )
+        except (OSError, ValueError, QuestionImportError) as exc:
+            raise CommandError(f'Import failed, nothing was written: {exc}')
+        
+        for error in stats.errors:
+            self.stdout.write(self.style.WARNING(f"  ⚠ {error}"))
+        self.stdout.write(self.style.SUCCESS(f"✅ {stats}"))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from quiz_app import blobs
+
+
+class Command(BaseCommand):
+    help = 'Delete stored question/answer texts that no row references any more'
+    
+    def handle(self, *args, **options):
+        self.stdout.write("\n🧹 Pruning unreferenced content blobs...")
+        
+        deleted = blobs.prune()
+        
+        self.stdout.write(self.style.SUCCESS(f"✅ Deleted {deleted} blobs"))
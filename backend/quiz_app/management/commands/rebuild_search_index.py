@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from quiz_app import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the question full-text search index'
+    
+    def handle(self, *args, **options):
+        self.stdout.write("\n🔎 Rebuilding question search index...")
+        
+        search.rebuild()
+        
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Search index rebuilt ({type(search.get_backend()).__name__})"
+        ))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from quiz_app.utils import recalculate_user_stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute profile statistics for all (or the given) users in one bulk pass'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids',
+                            help='Only recompute this user id (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+    
+    def handle(self, *args, **options):
+        self.stdout.write("\n📊 Recalculating user statistics...")
+        
+        written = recalculate_user_stats(options['user_ids'], batch_size=options['batch_size'])
+        
+        self.stdout.write(self.style.SUCCESS(f"✅ Updated {written} user profiles"))
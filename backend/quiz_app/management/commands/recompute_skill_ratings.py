@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from quiz_app.adaptive import recompute_ratings
+
+
+class Command(BaseCommand):
+    help = 'Rebuild adaptive practice skill ratings by replaying the graded answer history'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+    
+    def handle(self, *args, **options):
+        self.stdout.write("\n🎯 Recomputing skill ratings...")
+        
+        replayed = recompute_ratings(batch_size=options['batch_size'])
+        
+        self.stdout.write(self.style.SUCCESS(f"✅ Replayed {replayed} graded answers"))
@@ -1,4 +1,5 @@
 from django.core.management.base import BaseCommand
+from quiz_app.importer import import_questions
 from quiz_app.models import Question
 
 
@@ -639,19 +640,13 @@ for val in result:
             q['test_cases'] = [{'name': f'test_{i}', 'input': 'sample', 'output': 'expected'}]
             all_questions.append(q)
         
-        # Seed all questions
-        created_count = 0
-        for q_data in all_questions:
-            _, created = Question.objects.get_or_create(
-                title=q_data['title'],
-                topic=q_data['topic'],
-                defaults=q_data
-            )
-            if created:
-                created_count += 1
+        # Seed all questions (legacy topic/category codes such as 'dbs' are kept)
+        stats = import_questions(all_questions, strict_choices=False)
+        created_count = stats.created
         
         self.stdout.write(self.style.SUCCESS(f'\n✅ Database seeding complete!'))
         self.stdout.write(self.style.SUCCESS(f'Created: {created_count} new questions'))
+        self.stdout.write(f'{stats}')
         self.stdout.write(self.style.SUCCESS(f'\n📊 TOTAL QUESTIONS IN DATABASE:'))
         self.stdout.write(self.style.SUCCESS(f'✓ DSA: {Question.objects.filter(topic="dsa").count()} questions'))
         self.stdout.write(self.style.SUCCESS(f'✓ OOP: {Question.objects.filter(topic="oop").count()} questions'))
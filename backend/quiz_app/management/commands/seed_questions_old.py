@@ -1,4 +1,5 @@
 from django.core.management.base import BaseCommand
+from quiz_app.importer import import_questions
 from quiz_app.models import Question
 
 
@@ -104,19 +105,9 @@ class Command(BaseCommand):
                 'test_cases': [{'input': {'pattern': i}, 'output': 'functional result'}]
             })
         
-        # Seed all questions
-        created_count = 0
-        existing_count = 0
-        
-        for q_data in sample_questions:
-            question, created = Question.objects.get_or_create(
-                title=q_data['title'],
-                topic=q_data['topic'],  # Include topic in unique check
-                defaults=q_data
-            )
-            
-            if created:
-                created_count += 1
+        # Seed all questions (legacy topic/category codes such as 'dbs' are kept)
+        stats = import_questions(sample_questions, strict_choices=False)
+        created_count = stats.created
         
         existing_count = Question.objects.count() - created_count
         
@@ -126,6 +117,7 @@ class Command(BaseCommand):
         self.stdout.write(
             self.style.SUCCESS(f'Created: {created_count} new questions')
         )
+        self.stdout.write(f'{stats}')
         self.stdout.write(
             self.style.WARNING(f'Already existed: {existing_count} questions')
         )
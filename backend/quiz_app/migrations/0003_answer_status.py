@@ -0,0 +1,31 @@
+# Generated by Django 4.2.8 on 2026-10-18 17:44
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def mark_existing_answers_graded(apps, schema_editor):
+    # Answers created before async grading were graded inline
+    Answer = apps.get_model('quiz_app', 'Answer')
+    Answer.objects.update(status='graded', graded_at=F('submitted_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz_app', '0002_quizsession_questions_quizsession_quiz_type_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='answer',
+            name='graded_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='answer',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('graded', 'Graded'), ('failed', 'Failed')], default='pending', max_length=10),
+        ),
+        migrations.RunPython(mark_existing_answers_graded, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.8 on 2026-10-18 17:46
+
+from django.db import migrations, models
+
+
+def backfill_correct_answers(apps, schema_editor):
+    Leaderboard = apps.get_model('quiz_app', 'Leaderboard')
+    for entry in Leaderboard.objects.all():
+        entry.correct_answers = round(entry.accuracy * entry.questions_solved / 100)
+        entry.save(update_fields=['correct_answers'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz_app', '0003_answer_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='leaderboard',
+            name='correct_answers',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='leaderboard',
+            index=models.Index(fields=['period', 'score'], name='quiz_app_le_period_59dae1_idx'),
+        ),
+        migrations.RunPython(backfill_correct_answers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 4.2.8 on 2026-10-18 17:47
+
+from django.conf import settings
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+import django.db.models.deletion
+
+
+def backfill_daily_stats(apps, schema_editor):
+    QuizSession = apps.get_model('quiz_app', 'QuizSession')
+    DailyUserStats = apps.get_model('quiz_app', 'DailyUserStats')
+    today = timezone.localdate()
+    rows = (
+        QuizSession.objects.filter(status='completed', time_ended__isnull=False)
+        .annotate(day=TruncDate('time_ended'))
+        .order_by()
+        .values('user_id', 'day')
+        .annotate(
+            score=Sum('total_score'),
+            questions=Sum('total_questions'),
+            correct=Sum('correct_answers'),
+        )
+    )
+    DailyUserStats.objects.bulk_create([
+        DailyUserStats(
+            user_id=row['user_id'],
+            day=row['day'],
+            score=row['score'],
+            questions=row['questions'],
+            correct_answers=row['correct'],
+            expired_week=row['day'] < today - timedelta(days=6),
+            expired_month=row['day'] < today - timedelta(days=29),
+        )
+        for row in rows.iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('quiz_app', '0004_leaderboard_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyUserStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('score', models.IntegerField(default=0)),
+                ('questions', models.IntegerField(default=0)),
+                ('correct_answers', models.IntegerField(default=0)),
+                ('expired_week', models.BooleanField(default=False)),
+                ('expired_month', models.BooleanField(default=False)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='quiz_app_da_day_cf251a_idx')],
+                'unique_together': {('user', 'day')},
+            },
+        ),
+        migrations.RunPython(backfill_daily_stats, migrations.RunPython.noop),
+    ]
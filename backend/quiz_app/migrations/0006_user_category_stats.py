@@ -0,0 +1,41 @@
+# Generated by Django 4.2.8 on 2026-10-18 17:51
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('quiz_app', '0005_daily_user_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserCategoryStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(max_length=20)),
+                ('attempted', models.IntegerField(default=0)),
+                ('correct', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='category_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'category')},
+            },
+        ),
+        migrations.RemoveField(
+            model_name='userprofile',
+            name='overall_accuracy',
+        ),
+        migrations.RemoveField(
+            model_name='userprofile',
+            name='strong_areas',
+        ),
+        migrations.RemoveField(
+            model_name='userprofile',
+            name='weak_areas',
+        ),
+    ]
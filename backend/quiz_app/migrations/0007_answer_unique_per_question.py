@@ -0,0 +1,66 @@
+# Generated by Django 4.2.8 on 2026-10-18 17:53
+
+from django.db import migrations
+from django.db.models import Count, Max, Q
+
+
+def drop_duplicate_answers(apps, schema_editor):
+    # Keep the latest answer of every (session, question) pair
+    Answer = apps.get_model('quiz_app', 'Answer')
+    latest = (
+        Answer.objects.order_by()
+        .values('session_id', 'question_id')
+        .annotate(latest_id=Max('id'))
+        .values_list('latest_id', flat=True)
+    )
+    Answer.objects.exclude(id__in=list(latest)).delete()
+
+
+def backfill_category_stats(apps, schema_editor):
+    # Runs after the duplicates are gone, so each question counts once
+    Answer = apps.get_model('quiz_app', 'Answer')
+    UserCategoryStats = apps.get_model('quiz_app', 'UserCategoryStats')
+    UserProfile = apps.get_model('quiz_app', 'UserProfile')
+    rows = (
+        Answer.objects.filter(status='graded')
+        .order_by()
+        .values('session__user_id', 'question__category')
+        .annotate(attempted=Count('id'), correct=Count('id', filter=Q(is_correct=True)))
+    )
+    stats = [
+        UserCategoryStats(
+            user_id=row['session__user_id'],
+            category=row['question__category'],
+            attempted=row['attempted'],
+            correct=row['correct'],
+        )
+        for row in rows.iterator()
+    ]
+    UserCategoryStats.objects.bulk_create(stats, batch_size=1000)
+    
+    totals = {}
+    for row in stats:
+        attempted, correct = totals.get(row.user_id, (0, 0))
+        totals[row.user_id] = (attempted + row.attempted, correct + row.correct)
+    profiles = list(UserProfile.objects.filter(user_id__in=totals))
+    for profile in profiles:
+        profile.total_questions_solved, profile.total_correct_answers = totals[profile.user_id]
+    UserProfile.objects.bulk_update(
+        profiles, ['total_questions_solved', 'total_correct_answers'], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz_app', '0006_user_category_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_answers, migrations.RunPython.noop),
+        migrations.RunPython(backfill_category_stats, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='answer',
+            unique_together={('session', 'question')},
+        ),
+    ]
@@ -0,0 +1,51 @@
+from django.db import migrations
+from django.db.utils import OperationalError
+
+FTS_TABLE = 'quiz_app_question_fts'
+VECTOR_SQL = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(explanation, '')), 'C')"
+)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('ALTER TABLE quiz_app_question ADD COLUMN search_vector tsvector')
+        schema_editor.execute(f'UPDATE quiz_app_question SET search_vector = {VECTOR_SQL}')
+        schema_editor.execute(
+            'CREATE INDEX quiz_app_question_search_idx ON quiz_app_question USING gin (search_vector)'
+        )
+    elif vendor == 'sqlite':
+        try:
+            schema_editor.execute(
+                f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+                f"title, description, explanation, tokenize='porter unicode61')"
+            )
+        except OperationalError:
+            # SQLite built without FTS5: search falls back to the Python index
+            return
+        schema_editor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, description, explanation) '
+            f'SELECT id, title, description, explanation FROM quiz_app_question'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('ALTER TABLE quiz_app_question DROP COLUMN IF EXISTS search_vector')
+    elif vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz_app', '0007_answer_unique_per_question'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.8 on 2026-10-18 18:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz_app', '0008_question_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='leaderboard',
+            index=models.Index(fields=['period', 'rank'], name='quiz_app_le_period_5b59d4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='question',
+            index=models.Index(fields=['-created_at'], name='quiz_app_qu_created_04cc38_idx'),
+        ),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 4.2.8 on 2026-10-18 18:09
+
+from django.db import migrations, models
+import quiz_app.blobs
+from quiz_app.blobs import decode, digest, encode
+
+BLOB_COLUMNS = {
+    'Question': ('description', 'template_code', 'solution_code', 'explanation'),
+    'Answer': ('user_code',),
+}
+BATCH_SIZE = 500
+
+
+def _rewrite(apps, convert):
+    ContentBlob = apps.get_model('quiz_app', 'ContentBlob')
+    for model_name, fields in BLOB_COLUMNS.items():
+        model = apps.get_model('quiz_app', model_name)
+        last_pk = 0
+        while True:
+            rows = list(model.objects.filter(pk__gt=last_pk).order_by('pk').only('pk', *fields)[:BATCH_SIZE])
+            if not rows:
+                break
+            convert(ContentBlob, rows, fields)
+            model.objects.bulk_update(rows, fields)
+            last_pk = rows[-1].pk
+
+
+def texts_to_blobs(ContentBlob, rows, fields):
+    blobs = {}
+    for row in rows:
+        for name in fields:
+            text = getattr(row, name)
+            key = digest(text)
+            blobs[key] = text
+            setattr(row, name, key)
+    ContentBlob.objects.bulk_create(
+        [ContentBlob(digest=key, data=encode(text)) for key, text in blobs.items()],
+        ignore_conflicts=True
+    )
+
+
+def blobs_to_texts(ContentBlob, rows, fields):
+    keys = {getattr(row, name) for row in rows for name in fields}
+    data = dict(ContentBlob.objects.filter(digest__in=keys).values_list('digest', 'data'))
+    for row in rows:
+        for name in fields:
+            setattr(row, name, decode(data[getattr(row, name)]))
+
+
+def move_to_blobs(apps, schema_editor):
+    _rewrite(apps, texts_to_blobs)
+
+
+def move_from_blobs(apps, schema_editor):
+    _rewrite(apps, blobs_to_texts)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz_app', '0009_cursor_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContentBlob',
+            fields=[
+                ('digest', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('data', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        # The columns still hold text here; replace it with digests
+        migrations.RunPython(move_to_blobs, move_from_blobs),
+        migrations.AlterField(
+            model_name='answer',
+            name='user_code',
+            field=quiz_app.blobs.BlobTextField(),
+        ),
+        migrations.AlterField(
+            model_name='question',
+            name='description',
+            field=quiz_app.blobs.BlobTextField(),
+        ),
+        migrations.AlterField(
+            model_name='question',
+            name='explanation',
+            field=quiz_app.blobs.BlobTextField(help_text='Solution explanation'),
+        ),
+        migrations.AlterField(
+            model_name='question',
+            name='solution_code',
+            field=quiz_app.blobs.BlobTextField(help_text='Complete solution'),
+        ),
+        migrations.AlterField(
+            model_name='question',
+            name='template_code',
+            field=quiz_app.blobs.BlobTextField(help_text='Starter code template'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.8 on 2026-10-18 18:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz_app', '0010_content_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='question',
+            name='rating_offset',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='usercategorystats',
+            name='rating',
+            field=models.FloatField(default=1200.0),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.8 on 2026-10-18 18:33
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz_app', '0011_skill_ratings'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='leaderboard',
+            options={'ordering': ['-score', 'id']},
+        ),
+        migrations.RemoveIndex(
+            model_name='leaderboard',
+            name='quiz_app_le_period_5b59d4_idx',
+        ),
+        migrations.RemoveField(
+            model_name='leaderboard',
+            name='rank',
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.8 on 2026-10-18 21:05
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_first_grades(apps, schema_editor):
+    # Earlier grades were not kept; the latest one is the best estimate
+    Answer = apps.get_model('quiz_app', 'Answer')
+    Answer.objects.filter(status='graded').update(
+        rated_correct=F('is_correct'), rated_at=F('graded_at')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz_app', '0012_leaderboard_rank_on_read'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='answer',
+            name='rated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='answer',
+            name='rated_correct',
+            field=models.BooleanField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_first_grades, migrations.RunPython.noop),
+    ]
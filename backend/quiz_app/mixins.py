@@ -0,0 +1,109 @@
+import hashlib
+from datetime import datetime
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+from . import catalog
+
+
+class ConditionalGetMixin:
+    """
+    ETag/Last-Modified on read actions.
+
+    The validators come from one aggregate over the filtered queryset
+    (latest updated_at and row count, see fingerprint_aggregates), so an
+    unchanged resource is answered with 304 before anything is loaded or
+    serialized. Views whose payloads only change with the catalog set
+    catalog_fingerprint and validate against the catalog version instead,
+    which keeps their 304s and cache hits off the database. Responses are
+    marked no-cache so browsers revalidate instead of guessing a freshness
+    lifetime from Last-Modified.
+    """
+    fingerprint_aggregates = {
+        'last_modified': Max('updated_at'),
+        'count': Count('pk'),
+    }
+    catalog_fingerprint = False
+
+    def get_fingerprint_queryset(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.action == 'retrieve':
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return queryset
+
+    def get_fingerprint(self):
+        if self.catalog_fingerprint:
+            return catalog.catalog_fingerprint()
+        return self.get_fingerprint_queryset().order_by().aggregate(**self.fingerprint_aggregates)
+
+    def conditional_response(self, request, build):
+        """Return 304 when the client's copy is current, else ``build()``"""
+        fingerprint = self.get_fingerprint()
+        timestamps = [value for value in fingerprint.values() if isinstance(value, datetime)]
+        last_modified = int(max(timestamps).timestamp()) if timestamps else None
+        # The same fingerprint backs every page, filter set and format
+        digest = hashlib.md5(
+            f'{sorted(fingerprint.items())}|{request.get_full_path()}|'
+            f'{request.accepted_renderer.format}'.encode()
+        ).hexdigest()
+        etag = quote_etag(digest)
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = build()
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, no_cache=True)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        parent = super()
+        return self.conditional_response(request, lambda: parent.list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        parent = super()
+        return self.conditional_response(request, lambda: parent.retrieve(request, *args, **kwargs))
+
+
+class CatalogCacheMixin:
+    """Serve list/retrieve payloads from the versioned catalog cache"""
+    catalog_namespace = None
+
+    def list(self, request, *args, **kwargs):
+        parent = super()
+        return Response(catalog.cached_response_data(
+            request, self.catalog_namespace, lambda: parent.list(request, *args, **kwargs).data
+        ))
+
+    def retrieve(self, request, *args, **kwargs):
+        parent = super()
+        return Response(catalog.cached_response_data(
+            request, f'{self.catalog_namespace}:{kwargs[self.lookup_url_kwarg or self.lookup_field]}',
+            lambda: parent.retrieve(request, *args, **kwargs).data
+        ))
+
+
+class CursorPaginationMixin:
+    """
+    ``?pagination=cursor`` switches a list to cursor_pagination_class:
+    keyset pages over an indexed ordering with next/previous links and no
+    total count, so a deep page costs the same as the first one.
+    """
+    cursor_pagination_class = None
+
+    def uses_cursor_pagination(self):
+        return (
+            self.cursor_pagination_class is not None
+            and self.request.query_params.get('pagination') == 'cursor'
+        )
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator') and self.uses_cursor_pagination():
+            self._paginator = self.cursor_pagination_class()
+        return super().paginator
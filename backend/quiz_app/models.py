@@ -2,6 +2,18 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from .blobs import BlobTextField
+
+class ContentBlob(models.Model):
+    """A distinct value of a BlobTextField column, keyed by its SHA-256"""
+    digest = models.CharField(max_length=64, primary_key=True)
+    data = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return self.digest
+
+
 class Question(models.Model):
     DIFFICULTY_CHOICES = [
         ('easy', 'Easy'),
@@ -35,15 +47,16 @@ class Question(models.Model):
     ]
     
     title = models.CharField(max_length=255)
-    description = models.TextField()
+    description = BlobTextField()
     topic = models.CharField(max_length=20, choices=TOPIC_CHOICES)
     category = models.CharField(max_length=50, choices=CATEGORY_CHOICES)
     difficulty = models.CharField(max_length=10, choices=DIFFICULTY_CHOICES)
     
     # Code related fields
-    template_code = models.TextField(help_text="Starter code template")
-    solution_code = models.TextField(help_text="Complete solution")
-    explanation = models.TextField(help_text="Solution explanation")
+    # Stored once per distinct value, see blobs.py
+    template_code = BlobTextField(help_text="Starter code template")
+    solution_code = BlobTextField(help_text="Complete solution")
+    explanation = BlobTextField(help_text="Solution explanation")
     video_url = models.URLField(blank=True, null=True, help_text="Video explanation link")
     
     # Test cases as JSON
@@ -52,6 +65,8 @@ class Question(models.Model):
     # Metadata
     solved_count = models.IntegerField(default=0)
     avg_difficulty_rating = models.FloatField(default=0.0)
+    # Learned adjustment of the difficulty's skill rating, see adaptive.py
+    rating_offset = models.FloatField(default=0.0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -60,6 +75,7 @@ class Question(models.Model):
         indexes = [
             models.Index(fields=['difficulty', 'category']),
             models.Index(fields=['topic']),
+            models.Index(fields=['-created_at']),
         ]
     
     def __str__(self):
@@ -162,13 +178,28 @@ class QuizSession(models.Model):
 
 
 class Answer(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('graded', 'Graded'),
+        ('failed', 'Failed'),
+    ]
+    
     session = models.ForeignKey(QuizSession, on_delete=models.CASCADE, related_name='answers')
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
     
-    user_code = models.TextField()
+    user_code = BlobTextField()
     is_correct = models.BooleanField(default=False)
     score = models.IntegerField(default=0)
     
+    # Grading runs asynchronously; graded_at is set once the answer has
+    # been counted in the session stats
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    graded_at = models.DateTimeField(null=True, blank=True)
+    # Result and time of the first grade, the one the skill ratings were
+    # moved by (see adaptive.py); regrades leave them alone
+    rated_correct = models.BooleanField(null=True, blank=True)
+    rated_at = models.DateTimeField(null=True, blank=True)
+    
     feedback = models.TextField(blank=True)
     test_results = models.JSONField(default=dict)
     
@@ -176,6 +207,8 @@ class Answer(models.Model):
     
     class Meta:
         ordering = ['submitted_at']
+        # Resubmitting upserts the one answer per question of a session
+        unique_together = ('session', 'question')
     
     def __str__(self):
         return f"Answer to {self.question.title}"
@@ -188,11 +221,6 @@ class UserProfile(models.Model):
     total_questions_solved = models.IntegerField(default=0)
     total_quizzes_completed = models.IntegerField(default=0)
     total_correct_answers = models.IntegerField(default=0)
-    overall_accuracy = models.FloatField(default=0.0)
-    
-    # Strengths and weaknesses
-    weak_areas = models.JSONField(default=dict, help_text="Categories with low accuracy")
-    strong_areas = models.JSONField(default=dict, help_text="Categories with high accuracy")
     
     # Preferences
     preferred_difficulty = models.CharField(
@@ -215,6 +243,57 @@ class UserProfile(models.Model):
     
     def __str__(self):
         return f"Profile: {self.user.username}"
+    
+    @property
+    def overall_accuracy(self):
+        if not self.total_questions_solved:
+            return 0.0
+        return (self.total_correct_answers / self.total_questions_solved) * 100
+    
+    def _areas(self, matches):
+        # Derived from the per-category counters; prefetch category_stats
+        return {
+            stats.category: stats.accuracy
+            for stats in self.user.category_stats.all()
+            if stats.attempted and matches(stats.accuracy)
+        }
+    
+    @property
+    def weak_areas(self):
+        """Categories with low accuracy"""
+        return self._areas(lambda accuracy: accuracy < UserCategoryStats.WEAK_THRESHOLD)
+    
+    @property
+    def strong_areas(self):
+        """Categories with high accuracy"""
+        return self._areas(lambda accuracy: accuracy >= UserCategoryStats.STRONG_THRESHOLD)
+
+
+class UserCategoryStats(models.Model):
+    """Running attempted/correct counters and skill of one user in one category"""
+    # Category accuracy (percent) below which an area is weak / from which it is strong
+    WEAK_THRESHOLD = 70
+    STRONG_THRESHOLD = 85
+    # Skill rating of a user new to a category
+    INITIAL_RATING = 1200.0
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='category_stats')
+    category = models.CharField(max_length=20)
+    
+    attempted = models.IntegerField(default=0)
+    correct = models.IntegerField(default=0)
+    # Elo skill estimate in the category, see adaptive.py
+    rating = models.FloatField(default=INITIAL_RATING)
+    
+    class Meta:
+        unique_together = ('user', 'category')
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.category}"
+    
+    @property
+    def accuracy(self):
+        return (self.correct / self.attempted) * 100 if self.attempted else 0.0
 
 
 class Bookmark(models.Model):
@@ -245,16 +324,43 @@ class Leaderboard(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     period = models.CharField(max_length=10, choices=PERIOD_CHOICES)
     
-    rank = models.IntegerField()
+    # Ranks are not stored: see quiz_app.utils.ranked_leaderboard
     score = models.IntegerField()
     questions_solved = models.IntegerField()
+    correct_answers = models.IntegerField(default=0)
     accuracy = models.FloatField()
     
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
-        ordering = ['rank']
+        ordering = ['-score', 'id']
         unique_together = ('user', 'period')
+        indexes = [
+            models.Index(fields=['period', 'score']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.score} points ({self.period})"
+
+
+class DailyUserStats(models.Model):
+    """Per-user totals of completed sessions for one day (leaderboard rollup)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_stats')
+    day = models.DateField()
+    
+    score = models.IntegerField(default=0)
+    questions = models.IntegerField(default=0)
+    correct_answers = models.IntegerField(default=0)
+    
+    # Set once the bucket has been subtracted from the rolling leaderboards
+    expired_week = models.BooleanField(default=False)
+    expired_month = models.BooleanField(default=False)
+    
+    class Meta:
+        unique_together = ('user', 'day')
+        indexes = [
+            models.Index(fields=['day']),
+        ]
     
     def __str__(self):
-        return f"{self.user.username} - Rank {self.rank} ({self.period})"
+        return f"{self.user.username} - {self.day}"
@@ -0,0 +1,72 @@
+"""
+Random question sampling.
+
+Question ids are kept in memory, bucketed by (topic, category,
+difficulty), and rebuilt from one query when the catalog version changes
+(any question save, delete or import) and after QUESTION_POOL_TTL seconds,
+which picks up questions added by other processes. Drawing N random questions for a
+filter combination samples positions across the matching buckets, so it
+costs O(N) instead of an ORDER BY RANDOM() over the question table.
+"""
+import bisect
+import itertools
+import random
+import threading
+import time
+
+from django.conf import settings
+
+from . import catalog
+from .models import Question
+
+# Most questions a generated quiz may have
+MAX_SAMPLE = 50
+
+_lock = threading.Lock()
+_pools = None  # (catalog version, loaded at, {(topic, category, difficulty): [ids]})
+
+
+def get_pools():
+    global _pools
+    version = catalog.catalog_version()
+    with _lock:
+        if (
+            _pools is None or _pools[0] != version
+            or time.monotonic() - _pools[1] >= settings.QUESTION_POOL_TTL
+        ):
+            buckets = {}
+            rows = Question.objects.order_by('pk').values_list('pk', *catalog.FACETS)
+            for pk, *key in rows.iterator():
+                buckets.setdefault(tuple(key), []).append(pk)
+            _pools = (version, time.monotonic(), buckets)
+        return _pools[2]
+
+
+def matching_buckets(filters=None):
+    filters = filters or {}
+    return [
+        ids for key, ids in get_pools().items()
+        if all(value == filters.get(name, value) for name, value in zip(catalog.FACETS, key))
+    ]
+
+
+def sample(count, filters=None, exclude=frozenset()):
+    """
+    Up to ``count`` distinct random question ids matching the facet
+    ``filters``, skipping the ids in ``exclude``.
+    """
+    buckets = matching_buckets(filters)
+    ends = list(itertools.accumulate(len(ids) for ids in buckets))
+    total = ends[-1] if ends else 0
+    # At most len(exclude) of the drawn positions can be excluded, so this
+    # many always yields ``count`` ids when enough are left
+    positions = random.sample(range(total), min(total, count + len(exclude)))
+    chosen = []
+    for position in positions:
+        index = bisect.bisect_right(ends, position)
+        pk = buckets[index][position - (ends[index - 1] if index else 0)]
+        if pk not in exclude:
+            chosen.append(pk)
+            if len(chosen) == count:
+                break
+    return chosen
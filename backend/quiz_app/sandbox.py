@@ -0,0 +1,362 @@
+"""
+Grading sandbox: the program each grader worker runs.
+
+grader.py starts this file as a script in a fresh interpreter
+(``python -I -S sandbox.py LIMITS``) with an empty environment, so nothing
+from the web process - settings, secrets, open connections, app modules -
+exists in it. It must only import the standard library.
+
+Before reading any job the process isolates itself where the kernel
+allows it: no new privileges, new user and network namespaces (no network
+interfaces), and a chroot into an empty, already deleted directory, so
+there is no filesystem to read, and reports whether that succeeded;
+grader.py refuses unisolated workers unless GRADER_SANDBOX_COMMAND wraps
+them in an external jail (nsjail, bwrap, a container).
+
+The worker is a warm template: allowed modules are imported once, and
+each job runs in a child forked for it with its own rlimits (no core
+files, file writes, new file descriptors or processes, an address space
+budget), so one submission cannot leave state behind for the next.
+
+Jobs and results are JSON messages on stdin and stdout. Submissions run
+with a small set of builtins, import only ALLOWED_MODULES (as copies
+without private or module attributes) and may not name private or dunder
+attributes. These restrictions are a second line of defence; the process
+isolation is the boundary.
+"""
+import ast
+import builtins
+import ctypes
+import json
+import os
+import resource
+import signal
+import sys
+import tempfile
+import time
+import types
+from multiprocessing.connection import Connection
+
+# Modules a submission is allowed to import
+ALLOWED_MODULES = {
+    'bisect', 'collections', 'copy', 'functools', 'heapq', 'itertools',
+    'math', 'operator', 'random', 're', 'string', 'typing', 'dataclasses',
+}
+
+SAFE_BUILTIN_NAMES = [
+    'abs', 'all', 'any', 'bin', 'bool', 'chr', 'dict', 'divmod', 'enumerate',
+    'filter', 'float', 'format', 'frozenset', 'hasattr', 'hash', 'hex', 'int',
+    'isinstance', 'issubclass', 'iter', 'len', 'list', 'map', 'max', 'min',
+    'next', 'oct', 'ord', 'pow', 'print', 'range', 'repr', 'reversed', 'round',
+    'set', 'slice', 'sorted', 'str', 'sum', 'tuple', 'zip',
+    'Exception', 'ArithmeticError', 'AssertionError', 'AttributeError',
+    'IndexError', 'KeyError', 'NotImplementedError', 'RuntimeError',
+    'StopIteration', 'TypeError', 'ValueError', 'ZeroDivisionError',
+    'None', 'True', 'False',
+]
+
+# Attributes that reach frames, code objects or globals from ordinary objects
+BLOCKED_ATTRIBUTES = {
+    'ag_code', 'ag_frame', 'cr_await', 'cr_code', 'cr_frame', 'f_back',
+    'f_builtins', 'f_code', 'f_globals', 'f_locals', 'gi_code', 'gi_frame',
+    'gi_yieldfrom', 'mro', 'tb_frame', 'tb_next',
+}
+
+TIME_LIMIT_ERROR = 'Time limit exceeded'
+CPU_LIMIT_ERROR = 'CPU time limit exceeded'
+MEMORY_LIMIT_ERROR = 'Memory limit exceeded'
+LIMIT_ERRORS = {TIME_LIMIT_ERROR, CPU_LIMIT_ERROR, MEMORY_LIMIT_ERROR}
+
+# linux/sched.h and linux/prctl.h
+CLONE_NEWUSER = 0x10000000
+CLONE_NEWNET = 0x40000000
+PR_SET_NO_NEW_PRIVS = 38
+
+
+# BaseException so that a bare ``except Exception`` in user code cannot
+# swallow the limit signals
+class _CaseTimeout(BaseException):
+    pass
+
+
+class _CpuLimitExceeded(BaseException):
+    pass
+
+
+def normalize_value(value):
+    """Convert a value to its JSON form so outputs compare like test_cases do"""
+    try:
+        return json.loads(json.dumps(value))
+    except (TypeError, ValueError):
+        return repr(value)
+
+
+def _call_arguments(test_input):
+    if isinstance(test_input, dict):
+        return (), test_input
+    if isinstance(test_input, list):
+        return tuple(test_input), {}
+    if test_input is None:
+        return (), {}
+    return (test_input,), {}
+
+
+# ---------------------------------------------------------------------------
+# Restricted execution
+# ---------------------------------------------------------------------------
+
+_restricted_modules = {}
+
+
+def _restricted(module):
+    """A copy of ``module`` with its public, non-module attributes only"""
+    if module.__name__ not in _restricted_modules:
+        copy = types.ModuleType(module.__name__)
+        for name, value in vars(module).items():
+            if name.startswith('_'):
+                continue
+            if isinstance(value, types.ModuleType):
+                if value.__name__.split('.')[0] not in ALLOWED_MODULES:
+                    continue
+                value = _restricted(value)
+            setattr(copy, name, value)
+        _restricted_modules[module.__name__] = copy
+    return _restricted_modules[module.__name__]
+
+
+def _safe_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if level != 0 or name.split('.')[0] not in ALLOWED_MODULES:
+        raise ImportError(f"import of '{name}' is not allowed")
+    return _restricted(__import__(name, globals, locals, fromlist, level))
+
+
+_SAFE_BUILTINS = {name: getattr(builtins, name) for name in SAFE_BUILTIN_NAMES}
+_SAFE_BUILTINS['__import__'] = _safe_import
+
+
+def _safe_builtins():
+    # A fresh copy per submission so user code cannot tamper with the next one
+    return dict(_SAFE_BUILTINS)
+
+
+def check_source(tree):
+    """Reject names that lead out of the restricted builtins"""
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Attribute):
+            if node.attr.startswith('_') or node.attr in BLOCKED_ATTRIBUTES:
+                raise AttributeError(f"access to '{node.attr}' is not allowed")
+        elif isinstance(node, ast.Name):
+            if node.id.startswith('__') and node.id != '__name__':
+                raise NameError(f"name '{node.id}' is not allowed")
+        elif isinstance(node, ast.alias):
+            if any(part.startswith('_') for part in node.name.split('.')):
+                raise ImportError(f"import of '{node.name}' is not allowed")
+
+
+# ---------------------------------------------------------------------------
+# Process setup
+# ---------------------------------------------------------------------------
+
+def _address_space_in_use():
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[0]) * resource.getpagesize()
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _isolate():
+    """Drop privileges, network and filesystem; returns whether all succeeded"""
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+    except OSError:
+        return False
+    libc.prctl(PR_SET_NO_NEW_PRIVS, 1, 0, 0, 0)
+    if libc.unshare(CLONE_NEWUSER | CLONE_NEWNET) != 0 and libc.unshare(CLONE_NEWNET) != 0:
+        return False
+    try:
+        root = tempfile.mkdtemp(prefix='grader-')
+        parent = os.open(os.path.dirname(root), os.O_RDONLY)
+        try:
+            os.chroot(root)
+            os.chdir('/')
+            os.rmdir(os.path.basename(root), dir_fd=parent)
+        finally:
+            os.close(parent)
+    except OSError:
+        return False
+    return True
+
+
+def _set_limit(limit, value):
+    _, hard = resource.getrlimit(limit)
+    if hard != resource.RLIM_INFINITY:
+        value = min(value, hard)
+    resource.setrlimit(limit, (value, value))
+
+
+def _apply_limits(descriptors):
+    """Install rlimits that last for the lifetime of the worker"""
+    _set_limit(resource.RLIMIT_CORE, 0)
+    _set_limit(resource.RLIMIT_FSIZE, 0)
+    # Room for the result pipe of one job at a time
+    _set_limit(resource.RLIMIT_NOFILE, descriptors + 2)
+
+
+def _apply_job_limits(limits, address_space, descriptors):
+    """Install the rlimits of a forked job process"""
+    _set_limit(resource.RLIMIT_NPROC, 0)
+    # Descriptors 0 to descriptors - 1 are all open: no files or sockets after this
+    _set_limit(resource.RLIMIT_NOFILE, descriptors)
+    if address_space is not None:
+        _set_limit(resource.RLIMIT_AS, address_space + limits['memory_mb'] * 1024 * 1024)
+
+    signal.signal(signal.SIGALRM, _raise_timeout)
+    signal.signal(signal.SIGXCPU, _raise_cpu_limit)
+
+
+def _raise_timeout(signum, frame):
+    raise _CaseTimeout()
+
+
+def _raise_cpu_limit(signum, frame):
+    raise _CpuLimitExceeded()
+
+
+def _arm_cpu_limit(cpu_seconds):
+    """RLIMIT_CPU is cumulative, so move the soft limit past what is used"""
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = int(usage.ru_utime + usage.ru_stime) + cpu_seconds
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+# ---------------------------------------------------------------------------
+# Jobs
+# ---------------------------------------------------------------------------
+
+def _limit_error(exc):
+    if isinstance(exc, _CaseTimeout):
+        return TIME_LIMIT_ERROR
+    if isinstance(exc, _CpuLimitExceeded):
+        return CPU_LIMIT_ERROR
+    if isinstance(exc, MemoryError):
+        return MEMORY_LIMIT_ERROR
+    return f'{type(exc).__name__}: {exc}'
+
+
+def _load_entry_point(code, entry_point, timeout):
+    """Execute the submission once and return the function under test"""
+    tree = ast.parse(code, '<submission>')
+    check_source(tree)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        namespace = {'__builtins__': _safe_builtins(), '__name__': '__submission__'}
+        exec(compile(tree, '<submission>', 'exec'), namespace)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+    func = namespace.get(entry_point)
+    if not callable(func):
+        raise NameError(f"function '{entry_point}' is not defined")
+    return func
+
+
+def run_batch(job):
+    """
+    Load the submission once and stream every test case through it.
+    Returns ``{'error': str|None, 'cases': [...]}`` with one compact
+    ``{'passed', 'output', 'error', 'time_ms'}`` entry per test case.
+    """
+    _arm_cpu_limit(job['cpu_seconds'])
+    try:
+        func = _load_entry_point(job['code'], job['entry_point'], job['timeout'])
+    except BaseException as exc:
+        return {'error': _limit_error(exc), 'cases': []}
+
+    cases = []
+    for case in job['cases']:
+        result = {'passed': False, 'output': None, 'error': None}
+        args, kwargs = _call_arguments(case.get('input'))
+        signal.setitimer(signal.ITIMER_REAL, job['timeout'])
+        started = time.perf_counter()
+        try:
+            output = normalize_value(func(*args, **kwargs))
+            result['output'] = output
+            result['passed'] = output == normalize_value(case.get('output'))
+        except BaseException as exc:
+            result['error'] = _limit_error(exc)
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        result['time_ms'] = round((time.perf_counter() - started) * 1000, 3)
+        cases.append(result)
+    return {'error': None, 'cases': cases}
+
+
+def run_forked(job, limits, address_space):
+    """
+    Run ``job`` in a child forked for it, so whatever the submission changes
+    in imported modules or classes is gone before the next job.
+    """
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        status = 1
+        try:
+            _apply_job_limits(limits, address_space, max(read_fd, write_fd) + 1)
+            data = json.dumps(run_batch(job)).encode()
+            while data:
+                data = data[os.write(write_fd, data):]
+            status = 0
+        finally:
+            os._exit(status)
+
+    os.close(write_fd)
+    chunks = []
+    while True:
+        chunk = os.read(read_fd, 65536)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    os.close(read_fd)
+    _, status = os.waitpid(pid, 0)
+    if os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0:
+        return json.loads(b''.join(chunks))
+    # Killed by the hard CPU limit, or died before reporting (out of memory)
+    if os.WIFSIGNALED(status) and os.WTERMSIG(status) in (signal.SIGKILL, signal.SIGXCPU):
+        return {'error': CPU_LIMIT_ERROR, 'cases': []}
+    return {'error': MEMORY_LIMIT_ERROR, 'cases': []}
+
+
+def main(limits):
+    # Keep the job pipes on fresh descriptors; the standard streams of user
+    # code go nowhere
+    jobs = Connection(os.dup(0), writable=False)
+    results = Connection(os.dup(1), readable=False)
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+    os.close(devnull)
+
+    # Pay the import cost once per worker; nothing can be imported later
+    for module in ALLOWED_MODULES:
+        _restricted(__import__(module))
+    address_space = _address_space_in_use()
+    isolated = _isolate()
+    _apply_limits(max(jobs.fileno(), results.fileno()) + 1)
+    results.send_bytes(json.dumps({'isolated': isolated}).encode())
+
+    while True:
+        try:
+            job = json.loads(jobs.recv_bytes())
+        except (EOFError, OSError):
+            break
+        if job is None:
+            break
+        result = run_forked(job, limits, address_space)
+        results.send_bytes(json.dumps(result).encode())
+
+
+if __name__ == '__main__':
+    main(json.loads(sys.argv[1]))
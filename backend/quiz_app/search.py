@@ -0,0 +1,286 @@
+"""
+Full-text search over questions.
+
+Title, description and explanation are kept in an inverted index and
+matches are ranked by relevance (title weighted highest). All terms of a
+query must match and the last one is matched as a prefix, so results
+narrow while the user types.
+
+Three backends share one interface, picked by QUESTION_SEARCH_BACKEND
+('auto' chooses by database):
+
+- postgres: a weighted tsvector column with a GIN index, ranked by ts_rank_cd
+- sqlite: an FTS5 table ranked by bm25()
+- python: an in-memory BM25 index, for databases with neither; reloaded
+  after QUESTION_SEARCH_TTL seconds to pick up other processes' writes
+
+The database indexes are created by migration 0008 and updated from the
+Question post_save/post_delete signals. Writes that bypass signals
+(bulk_create, queryset.update) must call reindex() themselves.
+"""
+import bisect
+import math
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, Case, FloatField, IntegerField, Value, When
+from django.db.models.expressions import RawSQL
+
+from .models import Question
+
+FTS_TABLE = 'quiz_app_question_fts'
+
+# Relative weight of each indexed field
+FIELD_WEIGHTS = {'title': 3.0, 'description': 1.0, 'explanation': 0.5}
+
+# Best matches ordered by id lists (two SQL parameters each); the SQLite
+# backend lists the other matches after them, newest first, and the
+# Python backend returns no more than these
+MAX_RANKED = 300
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall((text or '').lower())
+
+
+def _in_rank_order(queryset, ids):
+    """Order ``queryset`` like ``ids``; rows missing from it follow, newest first"""
+    ids = ids[:MAX_RANKED]
+    order = Case(
+        *[When(pk=pk, then=Value(position)) for position, pk in enumerate(ids)],
+        default=Value(len(ids)),
+        output_field=IntegerField()
+    )
+    return queryset.annotate(search_rank=order).order_by('search_rank', '-created_at')
+
+
+class PostgresSearchBackend:
+    # setweight labels of the indexed fields, A ranks highest. The texts
+    # are passed in because description/explanation are stored as blobs.
+    VECTOR_SQL = (
+        "setweight(to_tsvector('english', %s), 'A') || "
+        "setweight(to_tsvector('english', %s), 'B') || "
+        "setweight(to_tsvector('english', %s), 'C')"
+    )
+    BATCH_SIZE = 1000
+
+    def _tsquery(self, terms):
+        return ' & '.join(terms[:-1] + [f'{terms[-1]}:*'])
+
+    def search(self, queryset, terms):
+        tsquery = self._tsquery(terms)
+        return queryset.filter(RawSQL(
+            "quiz_app_question.search_vector @@ to_tsquery('english', %s)",
+            [tsquery], output_field=BooleanField()
+        )).annotate(search_rank=RawSQL(
+            "ts_rank_cd(quiz_app_question.search_vector, to_tsquery('english', %s))",
+            [tsquery], output_field=FloatField()
+        )).order_by('-search_rank', '-created_at')
+
+    def index(self, ids):
+        rows = Question.objects.filter(pk__in=list(ids)).values_list(*FIELD_WEIGHTS, 'pk')
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'UPDATE quiz_app_question SET search_vector = {self.VECTOR_SQL} WHERE id = %s',
+                [[text or '' for text in row[:-1]] + [row[-1]] for row in rows]
+            )
+
+    def remove(self, ids):
+        # The vector is a column of the question row itself
+        pass
+
+    def rebuild(self):
+        ids = list(Question.objects.values_list('pk', flat=True))
+        for start in range(0, len(ids), self.BATCH_SIZE):
+            self.index(ids[start:start + self.BATCH_SIZE])
+
+
+class SqliteSearchBackend:
+    # Ids per statement, under SQLite's default limit of 999 parameters
+    BATCH_SIZE = 500
+
+    def _match(self, terms):
+        quoted = [f'"{term}"' for term in terms]
+        quoted[-1] += '*'
+        return ' '.join(quoted)
+
+    def search(self, queryset, terms):
+        match = self._match(terms)
+        weights = ', '.join(str(weight) for weight in FIELD_WEIGHTS.values())
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT %s',
+                [match, MAX_RANKED]
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        # Every match is joined in SQL, however broad the prefix
+        matching = queryset.filter(RawSQL(
+            f'quiz_app_question.id IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)',
+            [match], output_field=BooleanField()
+        ))
+        return _in_rank_order(matching, ids)
+
+    def _batches(self, ids):
+        ids = list(ids)
+        for start in range(0, len(ids), self.BATCH_SIZE):
+            yield ids[start:start + self.BATCH_SIZE]
+
+    def index(self, ids):
+        with connection.cursor() as cursor:
+            for batch in self._batches(ids):
+                rows = Question.objects.filter(pk__in=batch).values_list('pk', *FIELD_WEIGHTS)
+                self._delete(cursor, batch)
+                cursor.executemany(
+                    f'INSERT INTO {FTS_TABLE} (rowid, {", ".join(FIELD_WEIGHTS)}) VALUES (%s, %s, %s, %s)',
+                    list(rows)
+                )
+
+    def remove(self, ids):
+        with connection.cursor() as cursor:
+            for batch in self._batches(ids):
+                self._delete(cursor, batch)
+
+    def _delete(self, cursor, ids):
+        if ids:
+            placeholders = ', '.join(['%s'] * len(ids))
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', ids)
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        self.index(Question.objects.values_list('pk', flat=True))
+
+
+class _Bm25Index:
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, rows):
+        self.postings = {}
+        self.lengths = {}
+        for row in rows:
+            pk, length = row[0], 0.0
+            for field, text in zip(FIELD_WEIGHTS, row[1:]):
+                for term in tokenize(text):
+                    # Field weights scale the term frequency (BM25F-style)
+                    docs = self.postings.setdefault(term, {})
+                    docs[pk] = docs.get(pk, 0.0) + FIELD_WEIGHTS[field]
+                    length += FIELD_WEIGHTS[field]
+            self.lengths[pk] = length
+        self.vocabulary = sorted(self.postings)
+        self.average_length = sum(self.lengths.values()) / len(self.lengths) if self.lengths else 0.0
+
+    def _expand(self, term, prefix):
+        if not prefix:
+            return [term] if term in self.postings else []
+        start = bisect.bisect_left(self.vocabulary, term)
+        stop = bisect.bisect_left(self.vocabulary, term + '\uffff')
+        return self.vocabulary[start:stop]
+
+    def _term_scores(self, term):
+        docs = self.postings[term]
+        idf = math.log(1 + (len(self.lengths) - len(docs) + 0.5) / (len(docs) + 0.5))
+        scores = {}
+        for pk, frequency in docs.items():
+            norm = self.K1 * (1 - self.B + self.B * self.lengths[pk] / self.average_length)
+            scores[pk] = idf * frequency * (self.K1 + 1) / (frequency + norm)
+        return scores
+
+    def ranked_ids(self, terms):
+        totals = None
+        for position, term in enumerate(terms):
+            matches = {}
+            for expanded in self._expand(term, prefix=position == len(terms) - 1):
+                for pk, score in self._term_scores(expanded).items():
+                    matches[pk] = max(matches.get(pk, 0.0), score)
+            if totals is None:
+                totals = matches
+            else:
+                totals = {pk: totals[pk] + score for pk, score in matches.items() if pk in totals}
+            if not totals:
+                return []
+        return sorted(totals, key=lambda pk: (-totals[pk], -pk))
+
+
+class PythonSearchBackend:
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._index = None
+        self._loaded_at = None
+
+    def _get_index(self):
+        with self._lock:
+            if self._index is None or time.monotonic() - self._loaded_at >= self.ttl:
+                self._index = _Bm25Index(Question.objects.values_list('pk', *FIELD_WEIGHTS))
+                self._loaded_at = time.monotonic()
+            return self._index
+
+    def search(self, queryset, terms):
+        ids = self._get_index().ranked_ids(terms)[:MAX_RANKED]
+        return _in_rank_order(queryset.filter(pk__in=ids), ids)
+
+    def index(self, ids):
+        self.rebuild()
+
+    def remove(self, ids):
+        self.rebuild()
+
+    def rebuild(self):
+        # Reload lazily on the next search
+        with self._lock:
+            self._index = None
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def _auto_backend():
+    if connection.vendor == 'postgresql':
+        return 'postgres'
+    if connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names():
+        return 'sqlite'
+    return 'python'
+
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            name = settings.QUESTION_SEARCH_BACKEND
+            if name == 'auto':
+                name = _auto_backend()
+            if name == 'postgres':
+                _backend = PostgresSearchBackend()
+            elif name == 'sqlite':
+                _backend = SqliteSearchBackend()
+            else:
+                _backend = PythonSearchBackend(settings.QUESTION_SEARCH_TTL)
+        return _backend
+
+
+def search_questions(queryset, text):
+    """Filter ``queryset`` to questions matching ``text``, best match first"""
+    terms = tokenize(text)
+    if not terms:
+        return queryset
+    return get_backend().search(queryset, terms)
+
+
+def reindex(ids):
+    get_backend().index(ids)
+
+
+def remove(ids):
+    get_backend().remove(ids)
+
+
+def rebuild():
+    get_backend().rebuild()
@@ -9,6 +9,42 @@ from .models import (
 )
 
 
+def requested_fields(request):
+    """Field names of a ``?fields=a,b`` sparse fieldset, or None"""
+    if request is None or request.method not in ('GET', 'HEAD'):
+        return None
+    fields = request.query_params.get('fields')
+    if not fields:
+        return None
+    return {name.strip() for name in fields.split(',') if name.strip()}
+
+
+class SparseFieldsMixin:
+    """
+    Trim the top-level representation to the fields listed in ``?fields=``
+    (unknown names are ignored). Nested serializers are built without a
+    request in their context and keep all of their fields.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = requested_fields(self.context.get('request'))
+        if requested:
+            for name in set(self.fields) - requested:
+                self.fields.pop(name)
+    
+    @classmethod
+    def model_columns(cls, request):
+        """Concrete model fields the sparse representation reads, for .only()"""
+        requested = requested_fields(request)
+        if not requested:
+            return None
+        concrete = {field.name for field in cls.Meta.model._meta.concrete_fields}
+        if cls.Meta.fields != serializers.ALL_FIELDS:
+            concrete &= set(cls.Meta.fields)
+        return {'id'} | (requested & concrete)
+
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -73,7 +109,18 @@ class PasswordResetSerializer(serializers.Serializer):
         return data
 
 
-class QuestionSerializer(serializers.ModelSerializer):
+class QuestionListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """What the question browser shows, without code and test cases"""
+    
+    class Meta:
+        model = Question
+        fields = [
+            'id', 'title', 'description', 'topic', 'category', 'difficulty',
+            'solved_count', 'avg_difficulty_rating'
+        ]
+
+
+class QuestionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Question
         fields = [
@@ -83,10 +130,15 @@ class QuestionSerializer(serializers.ModelSerializer):
         ]
 
 
-class QuestionDetailSerializer(serializers.ModelSerializer):
+class QuestionDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    # Not rating_offset: it moves with every grade, the catalog cache does not
     class Meta:
         model = Question
-        fields = '__all__'
+        fields = [
+            'id', 'title', 'description', 'topic', 'category', 'difficulty',
+            'template_code', 'solution_code', 'explanation', 'video_url', 'test_cases',
+            'solved_count', 'avg_difficulty_rating', 'created_at', 'updated_at'
+        ]
 
 
 class QuizQuestionSerializer(serializers.ModelSerializer):
@@ -97,7 +149,8 @@ class QuizQuestionSerializer(serializers.ModelSerializer):
         fields = ['id', 'question', 'order']
 
 
-class QuizSerializer(serializers.ModelSerializer):
+class QuizSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    # Annotated with Count('questions') by QuizViewSet
     questions_count = serializers.SerializerMethodField()
     
     class Meta:
@@ -108,10 +161,12 @@ class QuizSerializer(serializers.ModelSerializer):
         ]
     
     def get_questions_count(self, obj):
+        if hasattr(obj, 'questions_count'):
+            return obj.questions_count
         return obj.questions.count()
 
 
-class QuizDetailSerializer(serializers.ModelSerializer):
+class QuizDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     questions = QuizQuestionSerializer(source='quizquestion_set', many=True, read_only=True)
     
     class Meta:
@@ -119,19 +174,18 @@ class QuizDetailSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class AnswerSerializer(serializers.ModelSerializer):
+class AnswerSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Answer
         fields = [
-            'id', 'question', 'user_code', 'is_correct', 'score',
-            'feedback', 'test_results', 'submitted_at'
+            'id', 'question', 'user_code', 'is_correct', 'score', 'status',
+            'feedback', 'test_results', 'submitted_at', 'graded_at'
         ]
 
 
-class QuizSessionSerializer(serializers.ModelSerializer):
+class QuizSessionListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """Summary of a session for listings, without questions or answers"""
     quiz_name = serializers.SerializerMethodField()
-    questions = QuestionDetailSerializer(many=True, read_only=True)
-    answers = AnswerSerializer(many=True, read_only=True)
     
     class Meta:
         model = QuizSession
@@ -139,7 +193,7 @@ class QuizSessionSerializer(serializers.ModelSerializer):
             'id', 'quiz', 'quiz_name', 'title', 'quiz_type', 'time_limit',
             'status', 'total_score', 'total_questions', 'correct_answers', 
             'wrong_answers', 'accuracy', 'time_spent', 'time_started', 
-            'time_ended', 'questions', 'answers'
+            'time_ended'
         ]
     
     def get_quiz_name(self, obj):
@@ -149,7 +203,15 @@ class QuizSessionSerializer(serializers.ModelSerializer):
         return obj.quiz.name if obj.quiz else 'Quiz'
 
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class QuizSessionSerializer(QuizSessionListSerializer):
+    questions = QuestionDetailSerializer(many=True, read_only=True)
+    answers = AnswerSerializer(many=True, read_only=True)
+    
+    class Meta(QuizSessionListSerializer.Meta):
+        fields = QuizSessionListSerializer.Meta.fields + ['questions', 'answers']
+
+
+class UserProfileSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     
     class Meta:
@@ -162,7 +224,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
         ]
 
 
-class BookmarkSerializer(serializers.ModelSerializer):
+class BookmarkSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     question = QuestionSerializer(read_only=True)
     
     class Meta:
@@ -170,8 +232,10 @@ class BookmarkSerializer(serializers.ModelSerializer):
         fields = ['id', 'question', 'notes', 'is_solved', 'created_at']
 
 
-class LeaderboardSerializer(serializers.ModelSerializer):
+class LeaderboardSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
+    # Annotated by ranked_leaderboard(); the ranked cache adds it to its rows
+    rank = serializers.IntegerField(read_only=True, required=False)
     
     class Meta:
         model = Leaderboard
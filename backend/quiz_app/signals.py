@@ -1,7 +1,8 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import UserProfile
+from . import catalog, search
+from .models import Question, Quiz, QuizQuestion, UserProfile
 
 
 @receiver(post_save, sender=User)
@@ -13,3 +14,25 @@ def create_user_profile(sender, instance, created, **kwargs):
 @receiver(post_save, sender=User)
 def save_user_profile(sender, instance, **kwargs):
     instance.profile.save()
+
+
+@receiver(post_save, sender=Question)
+def index_question(sender, instance, update_fields=None, **kwargs):
+    # Counter updates such as solved_count leave the index untouched
+    if update_fields is None or set(update_fields) & set(search.FIELD_WEIGHTS):
+        search.reindex([instance.pk])
+    catalog.bump_catalog_version()
+
+
+@receiver(post_delete, sender=Question)
+def unindex_question(sender, instance, **kwargs):
+    search.remove([instance.pk])
+    catalog.bump_catalog_version()
+
+
+@receiver(post_save, sender=Quiz)
+@receiver(post_delete, sender=Quiz)
+@receiver(post_save, sender=QuizQuestion)
+@receiver(post_delete, sender=QuizQuestion)
+def quiz_changed(sender, **kwargs):
+    catalog.bump_catalog_version()
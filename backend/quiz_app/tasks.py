@@ -0,0 +1,65 @@
+from celery import shared_task
+
+from . import adaptive
+from .grader import GraderBusy, GraderError, grade_question
+from .models import Answer
+from .utils import expire_leaderboard_buckets, record_grade, update_leaderboard
+
+
+def _fail(answer_id, code, error):
+    # Only if the code was not resubmitted meanwhile
+    Answer.objects.filter(pk=answer_id, user_code=code).update(status='failed', feedback=str(error))
+
+
+@shared_task(bind=True, max_retries=5)
+def grade_answer(self, answer_id):
+    """Run a submitted answer against its question and record the result"""
+    try:
+        answer = Answer.objects.select_related('question', 'session').get(pk=answer_id)
+    except Answer.DoesNotExist:
+        return
+    if answer.status != 'pending':
+        return
+    
+    code = answer.user_code
+    question = answer.question
+    if question.test_cases:
+        try:
+            test_results = grade_question(question, code)
+        except GraderBusy as e:
+            # Eager tasks run inside the web request, where no broker can
+            # hold a retry back: fail fast rather than sleep, the user can
+            # submit again
+            if self.request.is_eager or self.request.retries >= self.max_retries:
+                _fail(answer_id, code, e)
+                return
+            # Back off exponentially from the pool's own estimate
+            raise self.retry(countdown=e.retry_after * 2 ** self.request.retries)
+        except GraderError as e:
+            _fail(answer_id, code, e)
+            return
+        is_correct = test_results['all_passed']
+    else:
+        # Nothing to run the code against: accept any meaningful attempt
+        test_results = {}
+        is_correct = len(code.strip()) > 5
+    
+    record_grade(answer_id, code, is_correct, 10 if is_correct else 0, test_results)
+
+
+@shared_task
+def refresh_leaderboard():
+    """Recompute leaderboard rankings for every period"""
+    update_leaderboard()
+
+
+@shared_task
+def expire_leaderboard():
+    """Drop daily buckets that left the week/month windows"""
+    expire_leaderboard_buckets()
+
+
+@shared_task
+def flush_rating_offsets():
+    """Write question rating changes queued by recent grades"""
+    adaptive.flush_offsets()
@@ -1,6 +1,55 @@
+import gzip
+import json
+import os
+import tempfile
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import FieldError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from django.test import TestCase
+from rest_framework.test import APIClient
 from django.contrib.auth.models import User
-from quiz_app.models import Question, Quiz, QuizSession
+from quiz_app.models import (
+    Answer, ContentBlob, DailyUserStats, Leaderboard, Question, Quiz, QuizQuestion, QuizSession,
+    UserCategoryStats, UserProfile
+)
+from quiz_app.utils import (
+    LEADERBOARD_PERIODS, apply_leaderboard_delta, calculate_user_stats,
+    expire_leaderboard_buckets, ranked_leaderboard, recalculate_user_stats, record_grade,
+    update_leaderboard
+)
+from quiz_app import (
+    adaptive, blobs, catalog, exporter, importer, leaderboard_cache, question_pools, search
+)
+from quiz_app.grader import (
+    GraderBusy, GraderError, GraderPool, grade_question, grade_submission, grading_cache_key
+)
+
+
+def make_question(title='Q', description='d', **fields):
+    """A question with placeholder texts; ``fields`` override any column"""
+    values = {
+        'topic': 'dsa', 'category': 'arrays', 'difficulty': 'easy',
+        'template_code': '', 'solution_code': '', 'explanation': '',
+    }
+    values.update(fields)
+    return Question.objects.create(title=title, description=description, **values)
+
+
+def make_add_question(test_cases):
+    """The graded 'add two numbers' question"""
+    return make_question(
+        'Add', 'Add two numbers', category='math',
+        template_code='def add(a, b):\n    pass',
+        solution_code='def add(a, b):\n    return a + b',
+        explanation='Use +', test_cases=test_cases,
+    )
 
 
 class QuestionModelTest(TestCase):
@@ -29,3 +78,1032 @@ class UserProfileSignalTest(TestCase):
             password='testpass123'
         )
         self.assertTrue(hasattr(user, 'profile'))
+
+
+class GraderTest(TestCase):
+    def test_correct_solution_passes_all_cases(self):
+        code = 'def add(a, b):\n    return a + b'
+        cases = [
+            {'input': {'a': 1, 'b': 2}, 'output': 3},
+            {'input': [5, 5], 'output': 10},
+        ]
+        summary = grade_submission(code, cases, 'def add(a, b):\n    pass')
+        self.assertTrue(summary['all_passed'])
+        self.assertEqual(summary['passed'], 2)
+        self.assertEqual(len(summary['cases']), 2)
+        self.assertIn('time_ms', summary['cases'][0])
+    
+    def test_wrong_answer_and_forbidden_import(self):
+        cases = [{'input': [1], 'output': 1}]
+        summary = grade_submission('def f(x):\n    return x + 1', cases)
+        self.assertFalse(summary['all_passed'])
+        summary = grade_submission('import os\ndef f(x):\n    return x', cases)
+        self.assertIn('ImportError', summary['error'])
+        self.assertEqual(summary['passed'], 0)
+    
+    def test_infinite_loop_hits_timeout(self):
+        cases = [{'input': [], 'output': None}]
+        summary = grade_submission('def f():\n    while True:\n        pass', cases, timeout=0.2)
+        self.assertEqual(summary['cases'][0]['error'], 'Time limit exceeded')
+    
+    def test_syntax_error_is_reported(self):
+        summary = grade_submission('def f(:', [{'input': [], 'output': 1}])
+        self.assertIn('SyntaxError', summary['error'])
+    
+    def test_introspection_escapes_are_blocked(self):
+        cases = [{'input': [], 'output': 'escaped'}]
+        for code in [
+            "def f():\n    return str(().__class__.__base__.__subclasses__())",
+            "def f():\n    return str(getattr(f, 'f_globals'))",
+            "def f():\n    import random\n    return str(random._os)",
+            "def f():\n    import typing\n    return str(typing.sys.modules)",
+            "def f():\n    return str((x for x in []).gi_frame.f_back.f_globals)",
+            "def f():\n    return str(type.__subclasses__(object))",
+        ]:
+            summary = grade_submission(code, cases)
+            self.assertEqual(summary['passed'], 0, code)
+            self.assertTrue(summary['error'] or summary['cases'][0]['error'], code)
+
+
+class GraderPoolTest(TestCase):
+    def setUp(self):
+        self.job = {
+            'code': 'import heapq\ndef f(x):\n    return heapq.nlargest(1, x)',
+            'entry_point': 'f',
+            'cases': [{'input': [[1, 3, 2]], 'output': [3]}],
+            'timeout': 1,
+            'cpu_seconds': 5,
+        }
+    
+    def test_workers_are_recycled_after_max_jobs(self):
+        pool = GraderPool(size=1, max_pending=0, limits={'memory_mb': 256}, max_jobs=2)
+        try:
+            for _ in range(5):
+                self.assertTrue(pool.run(self.job, deadline=5)['cases'][0]['passed'])
+            self.assertEqual(pool.stats()['recycled'], 2)
+        finally:
+            pool.shutdown()
+    
+    def test_failed_respawns_never_hand_out_dead_workers(self):
+        pool = GraderPool(size=1, max_pending=0, limits={'memory_mb': 256})
+        spin = dict(self.job, code='def f(x):\n    while True:\n        pass')
+        try:
+            with mock.patch.object(pool, '_spawn', side_effect=GraderError('no worker')):
+                self.assertIsNone(pool.run(spin, deadline=0.5))
+                with self.assertRaises(GraderError):
+                    pool.run(self.job, deadline=5)
+            self.assertTrue(pool.run(self.job, deadline=5)['cases'][0]['passed'])
+            stats = pool.stats()
+            self.assertEqual((stats['timeouts'], stats['completed']), (1, 1))
+        finally:
+            pool.shutdown()
+    
+    def test_jobs_do_not_share_module_state(self):
+        pool = GraderPool(size=1, max_pending=0, limits={'memory_mb': 256})
+        poison = dict(self.job, code='import math\nmath.sqrt = lambda x: -1\ndef f(x):\n    return x')
+        clean = dict(self.job, code='import math\ndef f(x):\n    return [math.sqrt(9)]', cases=[
+            {'input': [0], 'output': [3.0]},
+        ])
+        try:
+            pool.run(poison, deadline=5)
+            self.assertTrue(pool.run(clean, deadline=5)['cases'][0]['passed'])
+        finally:
+            pool.shutdown()
+    
+    def test_saturated_pool_rejects_with_retry_after(self):
+        pool = GraderPool(size=1, max_pending=0, limits={'memory_mb': 256})
+        try:
+            pool._slots.acquire()
+            with self.assertRaises(GraderBusy) as ctx:
+                pool.run(self.job, deadline=5)
+            self.assertGreaterEqual(ctx.exception.retry_after, 1)
+            pool._slots.release()
+        finally:
+            pool.shutdown()
+
+
+class GradingCacheTest(TestCase):
+    def setUp(self):
+        caches['grading'].clear()
+        self.question = make_add_question([{'input': [1, 2], 'output': 3}])
+    
+    def test_identical_submission_is_not_regraded(self):
+        grade_question(self.question, 'def add(a, b):\n    return a + b')
+        with mock.patch('quiz_app.grader.grade_submission') as grade:
+            summary = grade_question(self.question, 'def add(a,b):  # same\n    return a+b')
+        grade.assert_not_called()
+        self.assertTrue(summary['all_passed'])
+    
+    def test_failures_and_errors_are_not_cached(self):
+        for code in ['def add(a, b):\n    return a - b', 'def add(a, b):\n    return a / 0']:
+            grade_question(self.question, code)
+            self.assertIsNone(caches['grading'].get(grading_cache_key(self.question, code)))
+    
+    def test_key_changes_with_test_cases(self):
+        code = 'def add(a, b):\n    return a + b'
+        key = grading_cache_key(self.question, code)
+        self.question.test_cases = [{'input': [2, 2], 'output': 4}]
+        self.assertNotEqual(key, grading_cache_key(self.question, code))
+
+
+class SubmitAnswerTest(TestCase):
+    def setUp(self):
+        caches['grading'].clear()
+        self.user = User.objects.create_user(username='grader', password='testpass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.question = make_add_question(
+            [{'input': [1, 2], 'output': 3}, {'input': [0, 0], 'output': 0}]
+        )
+        self.session = QuizSession.objects.create(user=self.user, status='in_progress')
+        self.session.questions.set([self.question])
+    
+    def submit(self, code):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                f'/api/sessions/{self.session.id}/submit_answer/',
+                {'question_id': self.question.id, 'code': code},
+                format='json'
+            )
+    
+    def test_answer_is_graded_and_pollable(self):
+        response = self.submit('def add(a, b):\n    return a + b')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], 'pending')
+        
+        poll = self.client.get(f'/api/sessions/{self.session.id}/answers/{response.data["id"]}/')
+        self.assertEqual(poll.data['status'], 'graded')
+        self.assertTrue(poll.data['is_correct'])
+        self.assertEqual(len(poll.data['test_results']['cases']), 2)
+    
+    def test_resubmission_replaces_previous_result(self):
+        self.submit('def add(a, b):\n    return a - b')
+        self.submit('def add(a, b):\n    return a + b')
+        self.session.refresh_from_db()
+        self.assertEqual(Answer.objects.filter(session=self.session).count(), 1)
+        self.assertEqual(self.session.correct_answers, 1)
+        self.assertEqual(self.session.wrong_answers, 0)
+        self.assertEqual(self.session.total_score, 10)
+        self.assertEqual(self.session.accuracy, 100)
+    
+    def test_resubmission_is_a_single_upsert(self):
+        self.submit('def add(a, b):\n    return a - b')
+        with mock.patch('quiz_app.views.grade_answer') as task:
+            # Session and question lookups, then the code blob, upsert and
+            # id lookup inside a savepoint, then the answer for the response
+            with self.captureOnCommitCallbacks(execute=True), self.assertNumQueries(8):
+                response = self.client.post(
+                    f'/api/sessions/{self.session.id}/submit_answer/',
+                    {'question_id': self.question.id, 'code': 'def add(a, b):\n    return b + a'},
+                    format='json'
+                )
+        task.delay.assert_called_once_with(response.data['id'])
+        self.assertEqual(Answer.objects.filter(session=self.session).count(), 1)
+        self.assertEqual(response.data['status'], 'pending')
+    
+    def test_grading_updates_profile_counters(self):
+        self.submit('def add(a, b):\n    return a - b')
+        self.submit('def add(a, b):\n    return a + b')
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertEqual(profile.total_questions_solved, 1)
+        self.assertEqual(profile.total_correct_answers, 1)
+        self.assertEqual(profile.strong_areas, {'math': 100})
+    
+    def test_pending_answers_are_polled_not_held_open(self):
+        with mock.patch('quiz_app.views.grade_answer'):
+            response = self.submit('def add(a, b):\n    return a + b')
+        poll = self.client.get(f'/api/sessions/{self.session.id}/answers/{response.data["id"]}/')
+        self.assertEqual(poll.status_code, 202)
+        self.assertEqual(poll['Retry-After'], '1')
+    
+    def test_busy_grader_fails_fast_inside_the_request(self):
+        busy = GraderBusy('Grading queue is full', retry_after=1)
+        with mock.patch('quiz_app.tasks.grade_question', side_effect=busy) as grade:
+            response = self.submit('def add(a, b):\n    return a + b')
+        grade.assert_called_once()
+        answer = Answer.objects.get(pk=response.data['id'])
+        self.assertEqual((answer.status, answer.feedback), ('failed', 'Grading queue is full'))
+    
+    def test_grader_errors_fail_the_answer(self):
+        error = GraderError('Cannot isolate grading workers')
+        with mock.patch('quiz_app.tasks.grade_question', side_effect=error):
+            response = self.submit('def add(a, b):\n    return a + b')
+        answer = Answer.objects.get(pk=response.data['id'])
+        self.assertEqual((answer.status, answer.feedback), ('failed', 'Cannot isolate grading workers'))
+        
+        with mock.patch('quiz_app.utils.grade_question', side_effect=error):
+            response = self.client.post(
+                '/api/submit-code/', {'question_id': self.question.id, 'code': 'x = 1'}, format='json'
+            )
+        self.assertEqual(response.status_code, 503)
+
+
+class QuestionSearchTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        make_question('Two Sum', 'Find two numbers adding up to a target using a hash map')
+        make_question('Binary Search', 'Search a sorted array', explanation='Halve the interval')
+        make_question('Merge Intervals', 'Merge overlapping ranges, binary not required')
+    
+    def titles(self, text):
+        response = self.client.get('/api/questions/', {'search': text})
+        return [row['title'] for row in response.data['results']]
+    
+    def test_ranks_title_matches_first_and_matches_prefixes(self):
+        self.assertEqual(self.titles('binary'), ['Binary Search', 'Merge Intervals'])
+        self.assertEqual(self.titles('bin'), ['Binary Search', 'Merge Intervals'])
+        self.assertEqual(self.titles('hash ma'), ['Two Sum'])
+        self.assertEqual(self.titles('interval'), ['Merge Intervals', 'Binary Search'])
+    
+    def test_index_follows_saves_and_deletes(self):
+        question = make_question('Graph Coloring', 'Color a graph')
+        self.assertEqual(self.titles('coloring'), ['Graph Coloring'])
+        question.title = 'Graph Painting'
+        question.save()
+        self.assertEqual(self.titles('painting'), ['Graph Painting'])
+        question.delete()
+        self.assertEqual(self.titles('graph'), [])
+    
+    def test_broad_searches_rank_only_the_best_matches(self):
+        backend = search.SqliteSearchBackend()
+        backend.BATCH_SIZE = 1
+        backend.rebuild()
+        titles = lambda text: list(
+            backend.search(Question.objects.all(), search.tokenize(text)).values_list('title', flat=True)
+        )
+        with mock.patch.object(search, 'MAX_RANKED', 1):
+            # Matches past the ranked ones still follow, newest first
+            self.assertEqual(titles('binary'), ['Binary Search', 'Merge Intervals'])
+            self.assertEqual(titles('interval'), ['Merge Intervals', 'Binary Search'])
+    
+    def test_python_backend_ranks_like_the_database(self):
+        backend = search.PythonSearchBackend(ttl=60)
+        titles = lambda text: list(
+            backend.search(Question.objects.all(), search.tokenize(text)).values_list('title', flat=True)
+        )
+        self.assertEqual(titles('binary'), ['Binary Search', 'Merge Intervals'])
+        self.assertEqual(titles('two numb'), ['Two Sum'])
+        self.assertEqual(titles('missing'), [])
+
+
+class ImporterTest(TestCase):
+    def row(self, title, **fields):
+        return dict({
+            'title': title, 'description': f'About {title}', 'topic': 'dsa',
+            'category': 'arrays', 'difficulty': 'easy',
+        }, **fields)
+    
+    def write(self, name, rows):
+        path = os.path.join(tempfile.mkdtemp(), name)
+        with open(path, 'w') as stream:
+            json.dump(rows, stream)
+        self.addCleanup(os.remove, path)
+        return path
+    
+    def test_streams_a_json_file_and_dedupes_on_title_and_topic(self):
+        make_question('Two Sum', 'old')
+        path = self.write('questions.json', [
+            self.row('Two Sum'),
+            self.row('Heap Sort'),
+            self.row('Heap Sort', difficulty='hard'),
+            self.row('Heap Sort', topic='pf', category='heap'),
+            self.row('No Difficulty', difficulty='extreme'),
+            {'title': 'Missing fields'},
+        ])
+        
+        stats = importer.import_file(path, batch_size=2)
+        
+        self.assertEqual((stats.created, stats.duplicates, stats.invalid), (2, 2, 2))
+        self.assertEqual(stats.rows, 6)
+        self.assertEqual(len(stats.errors), 2)
+        self.assertEqual(Question.objects.filter(title='Heap Sort').count(), 2)
+        self.assertEqual(Question.objects.get(title='Two Sum').description, 'old')
+        # bulk writes skip the signals, the importer indexes them itself
+        self.assertEqual(
+            set(search.search_questions(Question.objects.all(), 'heap').values_list('topic', flat=True)),
+            {'pf', 'dsa'}
+        )
+    
+    def test_update_overwrites_existing_questions(self):
+        importer.import_questions([self.row('Two Sum')])
+        imported_at = Question.objects.get(title='Two Sum').updated_at
+        
+        stats = importer.import_questions(
+            [self.row('Two Sum', difficulty='hard', explanation='Use a hash map')],
+            update_existing=True
+        )
+        
+        self.assertEqual((stats.created, stats.updated), (0, 1))
+        question = Question.objects.get(title='Two Sum')
+        self.assertEqual((question.difficulty, question.explanation), ('hard', 'Use a hash map'))
+        self.assertGreater(question.updated_at, imported_at)
+        self.assertEqual(search.search_questions(Question.objects.all(), 'hash').count(), 1)
+    
+    def test_malformed_values_are_counted_as_invalid(self):
+        stats = importer.import_questions([
+            self.row('Lists', topic=['dsa']),
+            self.row('Dicts', category={'name': 'arrays'}),
+            self.row('Numbers', description=42),
+            self.row('Cases', test_cases=[1, 2]),
+            self.row('Fine'),
+        ])
+        self.assertEqual((stats.created, stats.invalid), (1, 4))
+        self.assertEqual(stats.errors, [
+            'row 1: topic must be a string',
+            'row 2: category must be a string',
+            'row 3: description must be a string',
+            'row 4: test_cases must be a list of objects',
+        ])
+    
+    def test_unknown_choices_can_be_allowed(self):
+        rows = [self.row('Joins', topic='dbs', category='dbs')]
+        self.assertEqual(importer.import_questions(rows).invalid, 1)
+        self.assertEqual(importer.import_questions(rows, strict_choices=False).created, 1)
+
+
+class ExporterTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        importer.import_questions([
+            {'title': f'Question {i}', 'description': 'd', 'topic': 'dsa',
+             'category': 'arrays', 'difficulty': 'easy', 'test_cases': [{'input': i}]}
+            for i in range(5)
+        ])
+    
+    def path(self, name):
+        path = os.path.join(self.directory, name)
+        self.addCleanup(lambda: os.path.exists(path) and os.remove(path))
+        return path
+    
+    def test_streams_keyset_batches_and_resumes(self):
+        path = self.path('questions.jsonl.gz')
+        ids = sorted(Question.objects.values_list('id', flat=True))
+        
+        # Three batches of two, the last one short
+        with self.assertNumQueries(3):
+            stats = exporter.export_table('questions', path, batch_size=2, after_id=0)
+        self.assertEqual((stats.rows, stats.last_id), (5, ids[-1]))
+        
+        exporter.export_table('questions', path, after_id=ids[2])
+        with gzip.open(path, 'rt') as stream:
+            rows = [json.loads(line) for line in stream]
+        self.assertEqual([row['id'] for row in rows], ids + ids[3:])
+        self.assertEqual(rows[0]['test_cases'], [{'input': 0}])
+    
+    def test_csv_export_imports_back(self):
+        path = self.path('questions.csv.gz')
+        exporter.export_table('questions', path)
+        Question.objects.all().delete()
+        
+        stats = importer.import_file(path)
+        
+        self.assertEqual(stats.created, 5)
+        self.assertEqual(Question.objects.get(title='Question 3').test_cases, [{'input': 3}])
+    
+    def test_answers_of_one_user(self):
+        question = Question.objects.first()
+        for name in ('alice', 'bob'):
+            session = QuizSession.objects.create(user=User.objects.create_user(username=name))
+            Answer.objects.create(session=session, question=question, user_code=f'# {name}')
+        path = self.path('answers.jsonl')
+        
+        exporter.export_table('answers', path, user_id=User.objects.get(username='bob').id)
+        
+        with open(path) as stream:
+            rows = [json.loads(line) for line in stream]
+        self.assertEqual([row['user_code'] for row in rows], ['# bob'])
+
+
+class ContentBlobTest(TestCase):
+    def test_repeated_texts_are_stored_once(self):
+        code = 'def solve(nums):\n    return sorted(nums)\n' * 50
+        for i in range(3):
+            make_question(f'Question {i}', 'Shared description', solution_code=code)
+        
+        self.assertEqual(ContentBlob.objects.count(), 3)  # description, code and ''
+        stored = ContentBlob.objects.get(digest=blobs.digest(code)).data
+        self.assertEqual(bytes(stored)[:1], blobs.ZLIB)
+        self.assertLess(len(stored), len(code))
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT description FROM quiz_app_question LIMIT 1')
+            self.assertEqual(cursor.fetchone()[0], blobs.digest('Shared description'))
+    
+    def test_reads_are_transparent(self):
+        question = make_question('Two Sum', 'Find two numbers')
+        
+        with self.assertNumQueries(1):
+            self.assertEqual(Question.objects.get(pk=question.pk).description, 'Find two numbers')
+        self.assertEqual(
+            list(Question.objects.values_list('description', flat=True)), ['Find two numbers']
+        )
+        self.assertTrue(Question.objects.filter(description='Find two numbers').exists())
+        response = APIClient().get(f'/api/questions/{question.pk}/')
+        self.assertEqual(response.data['description'], 'Find two numbers')
+        with self.assertRaises(FieldError):
+            Question.objects.filter(description__icontains='two').exists()
+    
+    def test_prune_keeps_referenced_blobs(self):
+        question = make_question('Two Sum', 'First draft')
+        question.description = 'Final text'
+        question.save()
+        ContentBlob.objects.update(created_at=timezone.now() - blobs.PRUNE_GRACE * 2)
+        
+        self.assertEqual(blobs.prune(), 1)
+        self.assertFalse(ContentBlob.objects.filter(digest=blobs.digest('First draft')).exists())
+        self.assertEqual(Question.objects.get(pk=question.pk).description, 'Final text')
+
+
+class QuestionFacetsTest(TestCase):
+    def setUp(self):
+        caches['catalog'].clear()
+        self.client = APIClient()
+        for title, category, difficulty in [
+            ('Two Sum', 'arrays', 'easy'),
+            ('Three Sum', 'arrays', 'medium'),
+            ('Word Ladder', 'graphs', 'hard'),
+            ('Word Break', 'dynamic_programming', 'medium'),
+        ]:
+            make_question(title, category=category, difficulty=difficulty)
+    
+    def test_counts_apply_the_other_filters_from_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/questions/facets/', {'difficulty': 'medium'})
+        facets = response.data['facets']
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(facets['category']['arrays']['count'], 1)
+        self.assertEqual(facets['category']['graphs']['count'], 0)
+        # Difficulty counts ignore the difficulty filter itself
+        self.assertEqual(facets['difficulty']['hard']['count'], 1)
+        self.assertEqual(facets['difficulty']['medium']['count'], 2)
+        
+        response = self.client.get('/api/questions/facets/', {'search': 'word'})
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(response.data['facets']['category']['arrays']['count'], 0)
+    
+    def test_cached_until_questions_change(self):
+        self.client.get('/api/questions/by_category/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/questions/by_category/')
+        self.assertEqual(response.data['arrays'], {'name': 'Arrays', 'count': 2})
+        
+        Question.objects.filter(title='Two Sum').get().delete()
+        response = self.client.get('/api/questions/by_difficulty/')
+        self.assertEqual(response.data['easy']['count'], 0)
+
+
+class CatalogCacheTest(TestCase):
+    def setUp(self):
+        caches['catalog'].clear()
+        self.client = APIClient()
+        self.question = make_question('Two Sum')
+    
+    def test_pages_are_served_from_cache_until_the_catalog_changes(self):
+        self.client.get('/api/questions/', {'difficulty': 'easy', 'page': 1})
+        self.client.get(f'/api/questions/{self.question.id}/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/questions/', {'page': 1, 'difficulty': 'easy'})
+            self.client.get(f'/api/questions/{self.question.id}/')
+        self.assertEqual(response.data['results'][0]['title'], 'Two Sum')
+        
+        self.question.title = 'Three Sum'
+        self.question.save()
+        response = self.client.get('/api/questions/', {'difficulty': 'easy', 'page': 1})
+        self.assertEqual(response.data['results'][0]['title'], 'Three Sum')
+        response = self.client.get(f'/api/questions/{self.question.id}/')
+        self.assertEqual(response.data['title'], 'Three Sum')
+    
+    def test_quiz_changes_bump_the_version(self):
+        version = catalog.catalog_version()
+        Quiz.objects.create(name='Weekly', quiz_type='practice', difficulty='easy')
+        self.assertGreater(catalog.catalog_version(), version)
+    
+    def test_per_process_versions_are_renewed(self):
+        # Bumps made by other processes never reach a locmem cache
+        version = catalog.catalog_version()
+        later = time.time() + settings.CATALOG_VERSION_TTL + 1
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=later):
+            self.assertGreater(catalog.catalog_version(), version)
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        caches['catalog'].clear()
+        self.client = APIClient()
+        self.question = make_question('Two Sum')
+    
+    def test_unchanged_questions_return_304_without_queries(self):
+        response = self.client.get('/api/questions/')
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/questions/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        
+        self.question.title = 'Three Sum'
+        self.question.save()
+        response = self.client.get('/api/questions/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+    
+    def test_quiz_detail_changes_with_its_questions(self):
+        quiz = Quiz.objects.create(name='Weekly', quiz_type='practice', difficulty='easy')
+        etag = self.client.get(f'/api/quizzes/{quiz.id}/')['ETag']
+        QuizQuestion.objects.create(quiz=quiz, question=self.question, order=1)
+        response = self.client.get(f'/api/quizzes/{quiz.id}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(f'/api/quizzes/{quiz.id}/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+    
+    def test_leaderboard_revalidates_until_scores_move(self):
+        user = User.objects.create_user(username='polling')
+        apply_leaderboard_delta(user.id, timezone.localdate(), score=10, questions=1, correct=1)
+        etag = self.client.get('/api/leaderboard/top_performers/?period=week')['ETag']
+        response = self.client.get('/api/leaderboard/top_performers/?period=week', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_leaderboard_delta(user.id, timezone.localdate(), score=5, questions=1, correct=1)
+        response = self.client.get('/api/leaderboard/top_performers/?period=week', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+    
+    def test_cached_leaderboard_pages_revalidate_without_queries(self):
+        user = User.objects.create_user(username='polling')
+        apply_leaderboard_delta(user.id, timezone.localdate(), score=10, questions=1, correct=1)
+        etag = self.client.get('/api/leaderboard/?period=week')['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/leaderboard/?period=week', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_leaderboard_delta(user.id, timezone.localdate(), score=5, questions=1, correct=1)
+        response = self.client.get('/api/leaderboard/?period=week', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['score'], 15)
+    
+    def test_leaderboard_entries_revalidate_when_their_rank_moves(self):
+        leader, chaser = (User.objects.create_user(username=name) for name in ('leader', 'chaser'))
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_leaderboard_delta(leader.id, timezone.localdate(), score=10, questions=1, correct=1)
+            apply_leaderboard_delta(chaser.id, timezone.localdate(), score=5, questions=1, correct=1)
+        url = f"/api/leaderboard/{Leaderboard.objects.get(user=leader, period='week').id}/?period=week"
+        response = self.client.get(url)
+        self.assertEqual(response.data['rank'], 1)
+        
+        # Only the chaser's row changes, but the leader's rank does
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_leaderboard_delta(chaser.id, timezone.localdate(), score=10, questions=1, correct=1)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['rank'], 2)
+
+
+class CursorPaginationTest(TestCase):
+    def setUp(self):
+        caches['catalog'].clear()
+        self.client = APIClient()
+    
+    def walk(self, url):
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertNotIn('count', response.data)
+            seen.extend(response.data['results'])
+            url = response.data['next']
+        return seen
+    
+    def test_questions_page_newest_first(self):
+        for i in range(5):
+            make_question(f'Q{i}')
+        rows = self.walk('/api/questions/?pagination=cursor&page_size=2')
+        self.assertEqual([row['title'] for row in rows], ['Q4', 'Q3', 'Q2', 'Q1', 'Q0'])
+        # created_at is loaded with the page, not per row for the cursor
+        caches['catalog'].clear()
+        with self.assertNumQueries(1):
+            self.client.get('/api/questions/?pagination=cursor&page_size=2&fields=id,title')
+    
+    def test_sessions_and_leaderboard_use_cursors(self):
+        user = User.objects.create_user(username='cursor')
+        self.client.force_authenticate(user)
+        for _ in range(3):
+            QuizSession.objects.create(user=user)
+        self.assertEqual(len(self.walk('/api/sessions/?pagination=cursor&page_size=2')), 3)
+        
+        for i in range(3):
+            other = User.objects.create_user(username=f'ranked{i}')
+            apply_leaderboard_delta(other.id, timezone.localdate(), score=10 * i, questions=1)
+        rows = self.walk('/api/leaderboard/?period=week&pagination=cursor&page_size=2')
+        self.assertEqual([row['rank'] for row in rows], [1, 2, 3])
+
+
+class SparseFieldsTest(TestCase):
+    def setUp(self):
+        caches['catalog'].clear()
+        self.client = APIClient()
+        make_question(
+            'Two Sum', template_code='def f(): pass', test_cases=[{'input': [1], 'output': 1}]
+        )
+    
+    def test_list_is_lean_and_loads_only_requested_columns(self):
+        response = self.client.get('/api/questions/')
+        self.assertNotIn('test_cases', response.data['results'][0])
+        self.assertNotIn('template_code', response.data['results'][0])
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/questions/', {'fields': 'title,difficulty,bogus'})
+        self.assertEqual(set(response.data['results'][0]), {'title', 'difficulty'})
+        select = queries.captured_queries[-1]['sql']
+        self.assertIn('"title"', select)
+        self.assertNotIn('"description"', select)
+    
+    def test_other_serializers_honour_fields(self):
+        user = User.objects.create_user(username='sparse')
+        self.client.force_authenticate(user)
+        QuizSession.objects.create(user=user)
+        response = self.client.get('/api/sessions/', {'fields': 'id,accuracy'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'accuracy'})
+        response = self.client.get('/api/profile/me/', {'fields': 'total_questions_solved'})
+        self.assertEqual(set(response.data), {'total_questions_solved'})
+
+
+class QuizCatalogTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.questions = [make_question(f'Q{i}') for i in range(3)]
+    
+    def make_quizzes(self, count):
+        for _ in range(count):
+            quiz = Quiz.objects.create(name='Quiz', quiz_type='timed', difficulty='easy')
+            for order, question in enumerate(self.questions):
+                QuizQuestion.objects.create(quiz=quiz, question=question, order=order)
+    
+    def test_by_type_is_paginated_with_constant_queries(self):
+        self.make_quizzes(2)
+        # Page count and the annotated page
+        with self.assertNumQueries(2):
+            self.client.get('/api/quizzes/by_type/?type=timed')
+        self.make_quizzes(6)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/quizzes/by_type/?type=timed')
+        self.assertEqual(response.data['count'], 8)
+        self.assertEqual(response.data['results'][0]['questions_count'], 3)
+    
+    def test_detail_prefetches_questions(self):
+        self.make_quizzes(1)
+        quiz = Quiz.objects.get()
+        # Quiz, then its quiz questions joined with their questions
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/quizzes/{quiz.id}/')
+        self.assertEqual([q['question']['title'] for q in response.data['questions']], ['Q0', 'Q1', 'Q2'])
+
+
+class QuizSessionListTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='lister')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.quiz = Quiz.objects.create(name='Weekly', description='d', quiz_type='practice')
+        self.question = make_question()
+    
+    def make_sessions(self, count):
+        for _ in range(count):
+            session = QuizSession.objects.create(user=self.user, quiz=self.quiz, title='')
+            session.questions.set([self.question])
+            Answer.objects.create(session=session, question=self.question, user_code='pass')
+    
+    def test_list_uses_constant_queries(self):
+        self.make_sessions(2)
+        # Page count and the sessions joined with their quiz
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/sessions/')
+        self.make_sessions(8)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/sessions/')
+        self.assertEqual(response.data['count'], 10)
+        self.assertEqual(response.data['results'][0]['quiz_name'], 'Weekly')
+        self.assertNotIn('questions', response.data['results'][0])
+    
+    def test_review_prefetches_questions_and_answers(self):
+        self.make_sessions(1)
+        session = QuizSession.objects.get()
+        # Session, its questions and its answers
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/sessions/{session.id}/review/')
+        self.assertEqual(len(response.data['questions']), 1)
+        self.assertEqual(len(response.data['answers']), 1)
+
+
+class GenerateQuizTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='generator')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.easy = [make_question(f'Easy {i}', difficulty='easy') for i in range(6)]
+        self.hard = [make_question(f'Hard {i}', difficulty='hard') for i in range(3)]
+    
+    def generate(self, **data):
+        return self.client.post('/api/sessions/generate/', data, format='json')
+    
+    def test_samples_matching_questions_in_few_queries(self):
+        question_pools.get_pools()
+        # Solved ids, then session and question links inside a savepoint,
+        # then the questions and answers of the response
+        with self.assertNumQueries(7):
+            response = self.generate(count=4, difficulty='easy')
+        
+        self.assertEqual(response.status_code, 201)
+        ids = [question['id'] for question in response.data['questions']]
+        self.assertEqual(len(set(ids)), 4)
+        self.assertTrue(set(ids) <= {question.id for question in self.easy})
+        self.assertEqual(response.data['total_questions'], 4)
+    
+    def test_excludes_solved_questions(self):
+        session = QuizSession.objects.create(user=self.user)
+        for question in self.hard[:2]:
+            Answer.objects.create(session=session, question=question, user_code='x', is_correct=True)
+        
+        response = self.generate(count=5, difficulty='hard')
+        self.assertEqual([q['id'] for q in response.data['questions']], [self.hard[2].id])
+        
+        response = self.generate(count=5, difficulty='hard', exclude_solved=False)
+        self.assertEqual(len(response.data['questions']), 3)
+    
+    def test_pools_follow_catalog_changes(self):
+        self.assertEqual(self.generate(category='graphs').status_code, 400)
+        graph = make_question('Graph', difficulty='medium', category='graphs')
+        
+        response = self.generate(category='graphs')
+        self.assertEqual([q['id'] for q in response.data['questions']], [graph.id])
+        self.assertEqual(self.generate(count=0).status_code, 400)
+    
+    def test_pools_reload_questions_written_elsewhere(self):
+        question_pools.get_pools()
+        # bulk_create() skips the signals, as writes from other processes do
+        graph, = Question.objects.bulk_create([Question(
+            title='Graph', description='d', topic='dsa', category='graphs', difficulty='medium'
+        )])
+        self.assertEqual(self.generate(category='graphs').status_code, 400)
+        later = time.monotonic() + settings.QUESTION_POOL_TTL
+        with mock.patch('quiz_app.question_pools.time.monotonic', return_value=later):
+            response = self.generate(category='graphs')
+        self.assertEqual([q['id'] for q in response.data['questions']], [graph.id])
+
+
+class AdaptivePracticeTest(TestCase):
+    def setUp(self):
+        # Drop changes queued by other tests' grades
+        adaptive._pending_offsets.clear()
+        self.user = User.objects.create_user(username='learner')
+        self.session = QuizSession.objects.create(user=self.user)
+        self.questions = {
+            difficulty: [make_question(f'{difficulty} {i}', difficulty=difficulty) for i in range(2)]
+            for difficulty in ('easy', 'medium', 'hard')
+        }
+    
+    def grade(self, question, is_correct):
+        answer = Answer.objects.create(session=self.session, question=question, user_code='code')
+        with self.captureOnCommitCallbacks(execute=True):
+            return record_grade(answer.id, 'code', is_correct, 10 if is_correct else 0, {})
+    
+    def test_first_grade_moves_both_ratings(self):
+        question = self.questions['medium'][0]
+        answer = self.grade(question, True)
+        
+        # Even odds: the user gains K/2, the question loses K/2 once flushed
+        stats = UserCategoryStats.objects.get(user=self.user, category='arrays')
+        self.assertAlmostEqual(stats.rating, 1200 + adaptive.USER_K / 2)
+        question.refresh_from_db()
+        self.assertEqual(question.rating_offset, 0)
+        self.assertEqual(adaptive.flush_offsets(), 1)
+        question.refresh_from_db()
+        self.assertAlmostEqual(question.rating_offset, -adaptive.QUESTION_K / 2)
+        
+        # A regrade only corrects the counters
+        record_grade(answer.id, 'code', False, 0, {})
+        stats.refresh_from_db()
+        self.assertAlmostEqual(stats.rating, 1200 + adaptive.USER_K / 2)
+        answer.refresh_from_db()
+        self.assertEqual((answer.is_correct, answer.rated_correct), (False, True))
+        self.assertEqual(adaptive.flush_offsets(), 0)
+    
+    def test_picks_questions_near_the_target_rating(self):
+        UserCategoryStats.objects.create(user=self.user, category='arrays', rating=1400)
+        UserCategoryStats.objects.create(user=self.user, category='graphs', rating=900)
+        graph = make_question('Graph', category='graphs')
+        
+        # ~70% success at 1400 means questions rated ~1253: the mediums
+        picked = adaptive.next_questions(self.user, 1, 'arrays')
+        self.assertIn(picked['question_ids'][0], {q.id for q in self.questions['medium']})
+        picked = adaptive.next_questions(
+            self.user, 1, 'arrays', exclude={q.id for q in self.questions['medium']}
+        )
+        self.assertIn(picked['question_ids'][0], {q.id for q in self.questions['hard']})
+        # Without a category the weakest one is practised
+        self.assertEqual(adaptive.next_questions(self.user, 5)['question_ids'], [graph.id])
+    
+    def test_batch_recompute_matches_online_updates(self):
+        for question, is_correct in [
+            (self.questions['easy'][0], True), (self.questions['hard'][0], False),
+            (self.questions['medium'][0], True), (self.questions['hard'][1], True),
+        ]:
+            answer = self.grade(question, is_correct)
+        # Regrades are not replayed either
+        record_grade(answer.id, 'code', False, 0, {})
+        adaptive.flush_offsets()
+        online = UserCategoryStats.objects.get(user=self.user).rating
+        offsets = dict(Question.objects.values_list('pk', 'rating_offset'))
+        UserCategoryStats.objects.update(rating=0)
+        Question.objects.update(rating_offset=0)
+        
+        self.assertEqual(adaptive.recompute_ratings(batch_size=3), 4)
+        
+        self.assertAlmostEqual(UserCategoryStats.objects.get(user=self.user).rating, online)
+        for pk, offset in Question.objects.values_list('pk', 'rating_offset'):
+            self.assertAlmostEqual(offset, offsets[pk])
+    
+    def test_adaptive_session_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        
+        response = client.post('/api/sessions/adaptive/', {'count': 3}, format='json')
+        
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data['questions']), 3)
+        self.assertEqual(response.data['title'], 'Adaptive Practice')
+        self.assertAlmostEqual(response.data['adaptive']['skill'], 1200)
+
+
+class UpdateLeaderboardTest(TestCase):
+    def make_day(self, user, score, days_ago=0):
+        return DailyUserStats.objects.create(
+            user=user, day=timezone.localdate() - timedelta(days=days_ago),
+            score=score, questions=2, correct_answers=1,
+        )
+    
+    def test_ranks_all_periods_with_constant_queries(self):
+        alice = User.objects.create_user(username='alice')
+        bob = User.objects.create_user(username='bob')
+        self.make_day(alice, 10)
+        self.make_day(alice, 10, days_ago=20)
+        self.make_day(bob, 15)
+        Leaderboard.objects.create(
+            user=bob, period='week', score=0, questions_solved=0, accuracy=0
+        )
+        
+        # One aggregate, one upsert and one cleanup per period, plus
+        # flagging the buckets outside the week and month windows
+        with self.assertNumQueries(11):
+            written = update_leaderboard()
+        self.assertEqual(written, {'week': 2, 'month': 2, 'all_time': 2})
+        
+        week = dict(ranked_leaderboard('week').values_list('user__username', 'rank'))
+        self.assertEqual(week, {'bob': 1, 'alice': 2})
+        month = ranked_leaderboard('month').get(user=alice)
+        self.assertEqual((month.rank, month.score, month.accuracy), (1, 20, 50))
+    
+    def test_users_outside_the_window_are_dropped(self):
+        carol = User.objects.create_user(username='carol')
+        self.make_day(carol, 5, days_ago=10)
+        Leaderboard.objects.create(
+            user=carol, period='week', score=5, questions_solved=2, accuracy=50
+        )
+        update_leaderboard()
+        self.assertFalse(Leaderboard.objects.filter(period='week').exists())
+        self.assertTrue(Leaderboard.objects.filter(period='month', user=carol).exists())
+    
+    def test_expired_buckets_drop_out_of_rolling_boards(self):
+        dave = User.objects.create_user(username='dave')
+        today = timezone.localdate()
+        apply_leaderboard_delta(dave.id, today - timedelta(days=6), score=5, questions=1, correct=1)
+        apply_leaderboard_delta(dave.id, today, score=7, questions=1)
+        
+        self.assertEqual(expire_leaderboard_buckets(today + timedelta(days=1)), {'week': 1, 'month': 0})
+        week = Leaderboard.objects.get(user=dave, period='week')
+        self.assertEqual((week.score, week.questions_solved, week.accuracy), (7, 1, 0))
+        self.assertEqual(Leaderboard.objects.get(user=dave, period='month').score, 12)
+        
+        # Running again is a no-op, and a bucket leaving entirely removes the entry
+        self.assertEqual(expire_leaderboard_buckets(today + timedelta(days=1))['week'], 0)
+        expire_leaderboard_buckets(today + timedelta(days=7))
+        self.assertFalse(Leaderboard.objects.filter(user=dave, period='week').exists())
+
+
+class FinishSessionTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='finisher')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+    
+    def test_finish_updates_leaderboard_incrementally(self):
+        session = QuizSession.objects.create(
+            user=self.user, status='in_progress', total_score=20,
+            total_questions=4, correct_answers=2
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/api/sessions/{session.id}/finish/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'completed')
+        
+        entry = ranked_leaderboard('all_time').get(user=self.user)
+        self.assertEqual((entry.rank, entry.score, entry.accuracy), (1, 20, 50))
+        
+        again = self.client.post(f'/api/sessions/{session.id}/finish/')
+        self.assertEqual(again.status_code, 400)
+    
+    def test_ranks_are_computed_on_read(self):
+        users = [User.objects.create_user(username=f'u{i}') for i in range(5)]
+        deltas = [(0, 30), (1, 10), (2, 30), (3, 0), (1, 25), (4, 15), (3, 40), (0, -5)]
+        for index, delta in deltas:
+            apply_leaderboard_delta(users[index].id, timezone.localdate(), score=delta, questions=1)
+        
+        entries = list(ranked_leaderboard('week'))
+        for entry in entries:
+            expected = 1 + sum(1 for other in entries if other.score > entry.score)
+            self.assertEqual(entry.rank, expected, entry.user.username)
+
+
+class LeaderboardCacheTest(TestCase):
+    def setUp(self):
+        for period in LEADERBOARD_PERIODS:
+            leaderboard_cache.invalidate(period)
+        self.users = [User.objects.create_user(username=f'player{i}') for i in range(4)]
+        for user, score in zip(self.users, [30, 50, 30, 10]):
+            apply_leaderboard_delta(user.id, timezone.localdate(), score=score, questions=2)
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[0])
+    
+    def test_pages_and_ranks_come_from_the_cache(self):
+        self.client.get('/api/leaderboard/?period=week')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/leaderboard/?period=week&page=1')
+        self.assertEqual(response.data['count'], 4)
+        ranks = [(row['user']['username'], row['rank']) for row in response.data['results']]
+        self.assertEqual(ranks, [('player1', 1), ('player0', 2), ('player2', 2), ('player3', 4)])
+        
+        top = self.client.get('/api/leaderboard/top_performers/?period=week')
+        self.assertEqual(top.data[0]['user']['username'], 'player1')
+    
+    def test_write_through_updates_rank(self):
+        leaderboard_cache.top('week', 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_leaderboard_delta(self.users[0].id, timezone.localdate(), score=25)
+        response = self.client.get('/api/leaderboard/my_rank/?period=week&radius=1')
+        self.assertEqual(response.data['entry']['rank'], 1)
+        self.assertEqual(response.data['entry']['score'], 55)
+        self.assertEqual(len(response.data['neighbours']), 2)
+    
+    def test_missing_payloads_do_not_shift_ranks(self):
+        entries = [(50, {'score': 50}), (30, None), (30, {'score': 30}), (10, {'score': 10})]
+        rows = leaderboard_cache._with_ranks(1, 0, entries)
+        self.assertEqual([(row['score'], row['rank']) for row in rows], [(50, 1), (30, 2), (10, 4)])
+
+
+class UserStatsTest(TestCase):
+    def answer(self, session, question, is_correct):
+        Answer.objects.create(
+            session=session, question=question, user_code='pass',
+            is_correct=is_correct, status='graded'
+        )
+    
+    def test_stats_come_from_grouped_queries(self):
+        arrays, graphs = make_question(category='arrays'), make_question(category='graphs')
+        users = [User.objects.create_user(username=f'stats{i}') for i in range(3)]
+        for user in users:
+            session = QuizSession.objects.create(user=user, status='completed')
+            self.answer(session, arrays, True)
+            self.answer(session, graphs, False)
+        
+        # Sessions count, category aggregate, profile ids, profile fetch,
+        # then the bulk update, kept ratings, delete and insert inside one
+        # savepoint
+        with self.assertNumQueries(10):
+            self.assertEqual(recalculate_user_stats(), 3)
+        
+        profile = UserProfile.objects.get(user=users[0])
+        self.assertEqual(profile.total_questions_solved, 2)
+        self.assertEqual(profile.total_correct_answers, 1)
+        self.assertEqual(profile.overall_accuracy, 50)
+        self.assertEqual(profile.weak_areas, {'graphs': 0})
+        self.assertEqual(profile.strong_areas, {'arrays': 100})
+    
+    def test_users_without_history_are_reset(self):
+        user = User.objects.create_user(username='drifted')
+        for user_ids in ([user.id], None):
+            UserProfile.objects.filter(user=user).update(total_questions_solved=7, total_correct_answers=5)
+            UserCategoryStats.objects.create(user=user, category='arrays', attempted=7, correct=5)
+            recalculate_user_stats(user_ids)
+            profile = UserProfile.objects.get(user=user)
+            self.assertEqual((profile.total_questions_solved, profile.total_correct_answers), (0, 0))
+            self.assertFalse(UserCategoryStats.objects.filter(user=user).exists())
+    
+    def test_profile_reads_do_not_scan_answers(self):
+        user = User.objects.create_user(username='busy')
+        session = QuizSession.objects.create(user=user, status='completed')
+        for _ in range(20):
+            self.answer(session, make_question(category='arrays'), True)
+        calculate_user_stats(user)
+        
+        client = APIClient()
+        client.force_authenticate(user)
+        # Profile with its user, then the category counters
+        with self.assertNumQueries(2):
+            response = client.get('/api/profile/me/')
+        self.assertEqual(response.data['total_questions_solved'], 20)
+        self.assertEqual(response.data['strong_areas'], {'arrays': 100})
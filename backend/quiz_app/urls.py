@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import views
+from . import views, utils
 
 router = DefaultRouter()
 router.register(r'questions', views.QuestionViewSet, basename='question')
@@ -18,6 +18,9 @@ urlpatterns = [
     path('auth/current-user/', views.current_user, name='current-user'),
     path('auth/password-reset-request/', views.password_reset_request, name='password-reset-request'),
     path('auth/password-reset-confirm/', views.password_reset_confirm, name='password-reset-confirm'),
+    # Code execution
+    path('submit-code/', utils.submit_code, name='submit-code'),
+    path('grader/metrics/', utils.grader_metrics, name='grader-metrics'),
     # API routes
     path('', include(router.urls)),
 ]
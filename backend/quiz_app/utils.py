@@ -1,12 +1,22 @@
 from .models import (
     Question, Quiz, QuizSession, Answer, UserProfile,
-    Bookmark, Leaderboard
+    Bookmark, Leaderboard, DailyUserStats, UserCategoryStats
 )
+from . import adaptive, leaderboard_cache
+from .grader import GraderBusy, GraderError, get_pool, grade_question, grade_submission
 from rest_framework import status
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
-from django.db.models import Q
+from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.db.models import (
+    Case, Count, ExpressionWrapper, F, FloatField, OuterRef, Q, Subquery, Sum, Value, When
+)
+from django.db.models.functions import Cast, Coalesce
+from django.db.models.lookups import GreaterThan
 from datetime import timedelta
+from functools import partial
 from django.utils import timezone
 
 
@@ -14,99 +24,412 @@ from django.utils import timezone
 def submit_code(request):
     """
     Execute user code against test cases.
-    This is a placeholder - implement actual code execution
+    Test cases come from the question when question_id is given,
+    otherwise from the request body.
     """
     code = request.data.get('code')
-    test_cases = request.data.get('test_cases', [])
+    if not code:
+        return Response({'error': 'code required'}, status=status.HTTP_400_BAD_REQUEST)
     
-    results = []
-    for test_case in test_cases:
-        # Placeholder for code execution
-        results.append({
-            'input': test_case.get('input'),
-            'expected': test_case.get('output'),
-            'passed': True,  # Simplified
-            'output': None,
-        })
+    question_id = request.data.get('question_id')
+    try:
+        if question_id:
+            question = get_object_or_404(Question, id=question_id)
+            summary = grade_question(question, code)
+        else:
+            summary = grade_submission(code, request.data.get('test_cases', []))
+    except GraderBusy as e:
+        return Response(
+            {'error': str(e)},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={'Retry-After': str(e.retry_after)}
+        )
+    except GraderError as e:
+        return Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
     
-    return Response({'results': results})
+    return Response({
+        'results': summary['cases'],
+        'passed': summary['passed'],
+        'total': summary['total'],
+        'time_ms': summary['time_ms'],
+        'error': summary['error'],
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def grader_metrics(request):
+    """Throughput and queue statistics of the grading worker pool"""
+    return Response(get_pool().stats())
+
+
+def record_grade(answer_id, code, is_correct, score, test_results):
+    """
+    Store the grading result of an answer and fold it into the session stats.
+    Returns the answer, or None when the code was resubmitted while it was
+    being graded (the newer submission's own task will record that one).
+    """
+    with transaction.atomic():
+        answer = Answer.objects.select_for_update().get(pk=answer_id)
+        if answer.user_code != code:
+            return None
+        
+        # A regraded answer replaces its previous contribution
+        previous = answer.graded_at is not None
+        correct_delta = int(is_correct) - (int(answer.is_correct) if previous else 0)
+        wrong_delta = int(not is_correct) - (int(not answer.is_correct) if previous else 0)
+        score_delta = score - (answer.score if previous else 0)
+        
+        # One UPDATE computed from the row's current counters, so concurrent
+        # grades of the same session cannot overwrite each other
+        answered = F('correct_answers') + F('wrong_answers') + (correct_delta + wrong_delta)
+        QuizSession.objects.filter(pk=answer.session_id).update(
+            correct_answers=F('correct_answers') + correct_delta,
+            wrong_answers=F('wrong_answers') + wrong_delta,
+            total_score=F('total_score') + score_delta,
+            accuracy=Case(
+                When(GreaterThan(answered, 0), then=ExpressionWrapper(
+                    Cast(F('correct_answers') + correct_delta, FloatField()) * 100 / answered,
+                    output_field=FloatField()
+                )),
+                default=Value(0.0),
+            ),
+            updated_at=timezone.now(),
+        )
+        session = QuizSession.objects.only('user_id', 'status', 'time_ended').get(pk=answer.session_id)
+        
+        # A regrade only moves the correct count; a first grade is a new
+        # attempt and also updates the skill ratings
+        question = Question.objects.only('category', 'difficulty', 'rating_offset').get(pk=answer.question_id)
+        stats = apply_answer_stats(
+            session.user_id,
+            question.category,
+            attempted=0 if previous else 1,
+            correct=correct_delta
+        )
+        if not previous:
+            adaptive.record_result(stats, question, is_correct)
+            answer.rated_correct = is_correct
+            answer.rated_at = timezone.now()
+        
+        # Answers graded after the session finished still reach the leaderboard
+        if session.status == 'completed':
+            apply_leaderboard_delta(
+                session.user_id,
+                timezone.localdate(session.time_ended),
+                score=score_delta,
+                correct=correct_delta
+            )
+        
+        answer.is_correct = is_correct
+        answer.score = score
+        answer.test_results = test_results
+        if test_results.get('error'):
+            answer.feedback = test_results['error']
+        elif test_results:
+            answer.feedback = f"{test_results['passed']}/{test_results['total']} test cases passed"
+        else:
+            answer.feedback = ''
+        answer.status = 'graded'
+        answer.graded_at = timezone.now()
+        answer.save(update_fields=[
+            'is_correct', 'score', 'test_results', 'feedback', 'status', 'graded_at',
+            'rated_correct', 'rated_at',
+        ])
+    return answer
+
+
+def apply_answer_stats(user_id, category, attempted=0, correct=0):
+    """
+    Add attempted/correct deltas to the user's profile totals and to their
+    counters for ``category`` with atomic F() increments, so concurrent
+    grades never lose an update and reading a profile never scans answers.
+    Returns the category stats as they were before the increments (None
+    when there is nothing to add).
+    """
+    if not attempted and not correct:
+        return None
+    with transaction.atomic():
+        stats, _ = UserCategoryStats.objects.get_or_create(user_id=user_id, category=category)
+        UserCategoryStats.objects.filter(user_id=user_id, category=category).update(
+            attempted=F('attempted') + attempted,
+            correct=F('correct') + correct,
+        )
+        UserProfile.objects.filter(user_id=user_id).update(
+            total_questions_solved=F('total_questions_solved') + attempted,
+            total_correct_answers=F('total_correct_answers') + correct,
+            updated_at=timezone.now(),
+        )
+    return stats
 
 
 def calculate_user_stats(user):
     """Calculate and update user profile statistics"""
-    sessions = QuizSession.objects.filter(user=user, status='completed')
-    
-    if not sessions.exists():
-        return
-    
-    profile = user.profile
-    total_answers = Answer.objects.filter(session__user=user)
-    
-    profile.total_questions_solved = total_answers.count()
-    profile.total_quizzes_completed = sessions.count()
-    profile.total_correct_answers = total_answers.filter(is_correct=True).count()
+    recalculate_user_stats([user.id])
+
+
+def recalculate_user_stats(user_ids=None, batch_size=1000):
+    """
+    Rebuild profile counters for ``user_ids`` (all users when None) from
+    answer and session history, to repair drift or after a bulk import.
+    Users without history are reset to zero and lose their category rows.
     
-    if profile.total_questions_solved > 0:
-        profile.overall_accuracy = (profile.total_correct_answers / profile.total_questions_solved) * 100
+    Per-category totals come from one grouped aggregate over graded answers
+    with conditional counts, completed quizzes from one grouped count, and
+    everything is written back in bulk, so the number of queries does not
+    depend on the number of users or categories. Returns the number of
+    profiles written.
+    """
+    sessions = QuizSession.objects.filter(status='completed')
+    answers = Answer.objects.filter(status='graded')
+    if user_ids is not None:
+        sessions = sessions.filter(user_id__in=user_ids)
+        answers = answers.filter(session__user_id__in=user_ids)
     
-    # Calculate weak areas
-    weak_areas = {}
-    for category, _ in Question.CATEGORY_CHOICES:
-        answers = total_answers.filter(question__category=category)
-        if answers.exists():
-            correct = answers.filter(is_correct=True).count()
-            accuracy = (correct / answers.count()) * 100
-            if accuracy < 70:
-                weak_areas[category] = accuracy
+    quizzes_completed = dict(
+        sessions.order_by().values('user_id').annotate(count=Count('id')).values_list('user_id', 'count')
+    )
+    categories = {}
+    rows = (
+        answers.order_by()
+        .values('session__user_id', 'question__category')
+        .annotate(
+            attempted=Count('id'),
+            correct=Count('id', filter=Q(is_correct=True)),
+        )
+        .values_list('session__user_id', 'question__category', 'attempted', 'correct')
+    )
+    for user_id, category, attempted, correct in rows.iterator(chunk_size=batch_size):
+        categories.setdefault(user_id, {})[category] = (attempted, correct)
     
-    profile.weak_areas = weak_areas
-    profile.save()
+    if user_ids is None:
+        user_ids = UserProfile.objects.values_list('user_id', flat=True)
+    user_ids = sorted(set(user_ids))
+    written = 0
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        profiles = UserProfile.objects.in_bulk(batch, field_name='user_id')
+        now = timezone.now()
+        for user_id, profile in profiles.items():
+            counters = categories.get(user_id, {}).values()
+            profile.total_quizzes_completed = quizzes_completed.get(user_id, 0)
+            profile.total_questions_solved = sum(attempted for attempted, _ in counters)
+            profile.total_correct_answers = sum(correct for _, correct in counters)
+            profile.updated_at = now
+        with transaction.atomic():
+            UserProfile.objects.bulk_update(profiles.values(), [
+                'total_questions_solved', 'total_quizzes_completed',
+                'total_correct_answers', 'updated_at',
+            ])
+            # Skill ratings are not derived from the counters; keep them
+            existing = UserCategoryStats.objects.filter(user_id__in=batch)
+            ratings = {
+                (user_id, category): rating
+                for user_id, category, rating in existing.values_list('user_id', 'category', 'rating')
+            }
+            existing.delete()
+            UserCategoryStats.objects.bulk_create([
+                UserCategoryStats(
+                    user_id=user_id, category=category, attempted=attempted, correct=correct,
+                    rating=ratings.get((user_id, category), UserCategoryStats.INITIAL_RATING)
+                )
+                for user_id in batch
+                for category, (attempted, correct) in categories.get(user_id, {}).items()
+            ])
+        written += len(profiles)
+    return written
 
 
-def update_leaderboard():
-    """Update leaderboard rankings"""
-    now = timezone.now()
-    
-    # Weekly leaderboard
-    week_ago = now - timedelta(days=7)
-    weekly_users = QuizSession.objects.filter(
-        status='completed',
-        time_ended__gte=week_ago
-    ).values('user').distinct()
+# Rolling window of each period in days (None = all time)
+LEADERBOARD_PERIODS = {
+    'week': 7,
+    'month': 30,
+    'all_time': None,
+}
+
+
+def _window_start(period, today):
+    days = LEADERBOARD_PERIODS[period]
+    return None if days is None else today - timedelta(days=days - 1)
+
+
+def update_leaderboard(today=None, batch_size=1000):
+    """
+    Recompute every leaderboard period from the daily rollups.
+    Each period is one aggregate query over DailyUserStats (per-user sums)
+    followed by a batched upsert into
+    Leaderboard, so the cost does not depend on how many sessions exist.
+    Returns the number of entries written per period.
+    """
+    today = today or timezone.localdate()
+    written = {}
     
-    for user_data in weekly_users:
-        user_id = user_data['user']
-        user = User.objects.get(id=user_id)
+    for period in LEADERBOARD_PERIODS:
+        buckets = DailyUserStats.objects.all()
+        start = _window_start(period, today)
+        if start is not None:
+            buckets = buckets.filter(day__gte=start)
         
-        sessions = QuizSession.objects.filter(
-            user=user,
-            status='completed',
-            time_ended__gte=week_ago
+        rows = (
+            buckets.order_by()
+            .values('user_id')
+            .annotate(
+                total_score=Sum('score'),
+                total_questions=Sum('questions'),
+                total_correct=Sum('correct_answers'),
+            )
+            .values_list('user_id', 'total_score', 'total_questions', 'total_correct')
         )
         
-        score = sessions.aggregate(total=models.Sum('total_score'))['total'] or 0
-        solved = Answer.objects.filter(
-            session__user=user,
-            session__status='completed',
-            session__time_ended__gte=week_ago,
-            is_correct=True
-        ).count()
+        refreshed_at = timezone.now()
+        count = 0
+        batch = []
+        for user_id, score, questions, correct in rows.iterator(chunk_size=batch_size):
+            batch.append(Leaderboard(
+                user_id=user_id,
+                period=period,
+                score=score,
+                questions_solved=questions,
+                correct_answers=correct,
+                accuracy=(correct / questions * 100) if questions else 0,
+            ))
+            if len(batch) >= batch_size:
+                count += _upsert_leaderboard(batch)
+                batch = []
+        if batch:
+            count += _upsert_leaderboard(batch)
         
-        if solved > 0:
-            accuracy = (solved / Answer.objects.filter(
-                session__user=user,
-                session__time_ended__gte=week_ago
-            ).count()) * 100
-        else:
-            accuracy = 0
-        
-        Leaderboard.objects.update_or_create(
-            user=user,
-            period='week',
-            defaults={
-                'score': score,
-                'questions_solved': solved,
-                'accuracy': accuracy,
-                'rank': 0  # Will be set after all calculations
-            }
+        # Users without sessions in the window were not touched by the upsert
+        Leaderboard.objects.filter(period=period, updated_at__lt=refreshed_at).delete()
+        leaderboard_cache.invalidate(period)
+        if start is not None:
+            flag = f'expired_{period}'
+            DailyUserStats.objects.filter(day__lt=start, **{flag: False}).update(**{flag: True})
+        written[period] = count
+    
+    return written
+
+
+def _upsert_leaderboard(entries):
+    Leaderboard.objects.bulk_create(
+        entries,
+        update_conflicts=True,
+        unique_fields=['user', 'period'],
+        update_fields=['score', 'questions_solved', 'correct_answers', 'accuracy', 'updated_at'],
+    )
+    return len(entries)
+
+
+def apply_leaderboard_delta(user_id, day, score=0, questions=0, correct=0):
+    """
+    Add score/question/correct deltas earned on ``day`` to the user's daily
+    rollup and to every period whose window still contains that day.
+    
+    Only the user's own rows are written: ranks are computed on read (see
+    ranked_leaderboard), so no other entry changes and nothing rescans
+    session history.
+    """
+    with transaction.atomic():
+        bucket, _ = DailyUserStats.objects.select_for_update().get_or_create(user_id=user_id, day=day)
+        DailyUserStats.objects.filter(pk=bucket.pk).update(
+            score=F('score') + score,
+            questions=F('questions') + questions,
+            correct_answers=F('correct_answers') + correct,
         )
+        entries = [
+            _apply_period_delta(user_id, period, score, questions, correct)
+            for period in LEADERBOARD_PERIODS
+            if not getattr(bucket, f'expired_{period}', False)
+        ]
+        transaction.on_commit(lambda: leaderboard_cache.write_entries(entries))
+
+
+def expire_leaderboard_buckets(today=None):
+    """
+    Subtract daily buckets that slid out of the week/month windows.
+    Only the expired buckets are read; each is flagged so the job is
+    idempotent and catches up after downtime. Returns the number of
+    entries adjusted per period.
+    """
+    today = today or timezone.localdate()
+    adjusted = {}
+    
+    for period in LEADERBOARD_PERIODS:
+        start = _window_start(period, today)
+        if start is None:
+            continue
+        flag = f'expired_{period}'
+        with transaction.atomic():
+            expiring = DailyUserStats.objects.select_for_update().filter(day__lt=start, **{flag: False})
+            totals = (
+                expiring.order_by()
+                .values('user_id')
+                .annotate(
+                    total_score=Sum('score'),
+                    total_questions=Sum('questions'),
+                    total_correct=Sum('correct_answers'),
+                )
+            )
+            updated, removed = [], []
+            for row in totals:
+                entry = _apply_period_delta(
+                    row['user_id'], period,
+                    -row['total_score'], -row['total_questions'], -row['total_correct']
+                )
+                if entry.questions_solved <= 0:
+                    entry.delete()
+                    removed.append(entry.user_id)
+                else:
+                    updated.append(entry)
+            expiring.update(**{flag: True})
+            transaction.on_commit(
+                partial(_sync_leaderboard_cache, period, updated, removed)
+            )
+        adjusted[period] = len(totals)
+    
+    return adjusted
+
+
+def _sync_leaderboard_cache(period, updated, removed):
+    leaderboard_cache.write_entries(updated)
+    for user_id in removed:
+        leaderboard_cache.remove_entry(period, user_id)
+
+
+def _apply_period_delta(user_id, period, score, questions, correct):
+    entry = Leaderboard.objects.select_for_update().filter(user_id=user_id, period=period).first()
+    
+    if entry is None:
+        entry = Leaderboard(
+            user_id=user_id, period=period, score=score,
+            questions_solved=questions, correct_answers=correct
+        )
+    else:
+        entry.score += score
+        entry.questions_solved += questions
+        entry.correct_answers += correct
+    
+    if entry.questions_solved:
+        entry.accuracy = (entry.correct_answers / entry.questions_solved) * 100
+    else:
+        entry.accuracy = 0
+    entry.save()
+    return entry
+
+
+def ranked_leaderboard(period):
+    """
+    Entries of ``period`` best first, annotated with their competition rank
+    (1 + the number of higher scores), counted over the (period, score)
+    index when read instead of being stored and shifted on every change.
+    """
+    higher = (
+        Leaderboard.objects.filter(period=OuterRef('period'), score__gt=OuterRef('score'))
+        .order_by()
+        .values('period')
+        .annotate(count=Count('pk'))
+        .values('count')
+    )
+    return Leaderboard.objects.filter(period=period).annotate(
+        rank=Coalesce(Subquery(higher), 0) + 1
+    )
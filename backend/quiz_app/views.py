@@ -2,28 +2,34 @@ from django.shortcuts import get_object_or_404
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth.models import User
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
-from django.db.models import Q
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Prefetch, Q
 from django.utils import timezone
-from datetime import timedelta
 
 from .models import (
     Question, Quiz, QuizSession, Answer, UserProfile,
-    Bookmark, Leaderboard
+    Bookmark, QuizQuestion
 )
 from .serializers import (
-    QuestionSerializer, QuestionDetailSerializer, QuizSerializer,
-    QuizDetailSerializer, QuizSessionSerializer, AnswerSerializer,
+    QuestionSerializer, QuestionListSerializer, QuestionDetailSerializer, QuizSerializer,
+    QuizDetailSerializer, QuizSessionSerializer, QuizSessionListSerializer,
+    AnswerSerializer,
     UserProfileSerializer, BookmarkSerializer, LeaderboardSerializer,
     UserRegistrationSerializer, PasswordResetRequestSerializer,
-    PasswordResetSerializer
+    PasswordResetSerializer, requested_fields
 )
+from .mixins import CatalogCacheMixin, ConditionalGetMixin, CursorPaginationMixin
+from .tasks import grade_answer
+from . import adaptive, catalog, leaderboard_cache, question_pools, search
+from .utils import LEADERBOARD_PERIODS, apply_leaderboard_delta, ranked_leaderboard
 
 
 class StandardResultsSetPagination(PageNumberPagination):
@@ -32,75 +38,89 @@ class StandardResultsSetPagination(PageNumberPagination):
     max_page_size = 100
 
 
-class QuestionViewSet(viewsets.ModelViewSet):
+class NewestFirstCursorPagination(CursorPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = '-created_at'
+
+
+class RankCursorPagination(NewestFirstCursorPagination):
+    ordering = ('-score', 'id')
+
+
+class QuestionViewSet(CursorPaginationMixin, ConditionalGetMixin, CatalogCacheMixin, viewsets.ModelViewSet):
     queryset = Question.objects.all()
+    catalog_namespace = 'questions'
+    catalog_fingerprint = True
     pagination_class = StandardResultsSetPagination
+    cursor_pagination_class = NewestFirstCursorPagination
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     
     def get_serializer_class(self):
         if self.action == 'retrieve':
             return QuestionDetailSerializer
+        if self.action == 'list':
+            return QuestionListSerializer
         return QuestionSerializer
     
     def get_queryset(self):
-        queryset = Question.objects.all()
-        
-        # Filter by difficulty
-        difficulty = self.request.query_params.get('difficulty')
-        if difficulty:
-            queryset = queryset.filter(difficulty=difficulty)
-        
-        # Filter by category
-        category = self.request.query_params.get('category')
-        if category:
-            queryset = queryset.filter(category=category)
-        
-        # Filter by topic
-        topic = self.request.query_params.get('topic')
-        if topic:
-            queryset = queryset.filter(topic=topic)
-        
-        # Search by title/description
-        search = self.request.query_params.get('search')
-        if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) |
-                Q(description__icontains=search)
+        # Filter by difficulty, category and topic
+        queryset = Question.objects.filter(**catalog.filters_from(self.request.query_params))
+        
+        # Lists only load the columns they render (narrowed further by ?fields=),
+        # plus the one cursors are built from
+        if self.action == 'list':
+            columns = QuestionListSerializer.model_columns(self.request)
+            queryset = queryset.only(
+                *(columns or QuestionListSerializer.Meta.fields),
+                self.cursor_pagination_class.ordering.lstrip('-')
             )
         
+        # Full-text search, best match first
+        text = self.request.query_params.get('search')
+        if text:
+            queryset = search.search_questions(queryset, text)
+        
         return queryset
     
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """Question counts per topic/category/difficulty under the active filters"""
+        params = request.query_params
+        return Response(catalog.facet_counts(catalog.filters_from(params), params.get('search', '')))
+    
     @action(detail=False, methods=['get'])
     def by_category(self, request):
         """Get questions grouped by category"""
-        categories = Question.CATEGORY_CHOICES
-        result = {}
-        for cat_val, cat_name in categories:
-            count = Question.objects.filter(category=cat_val).count()
-            result[cat_val] = {'name': cat_name, 'count': count}
-        return Response(result)
+        return Response(catalog.facet_counts()['facets']['category'])
     
     @action(detail=False, methods=['get'])
     def by_difficulty(self, request):
         """Get question count by difficulty"""
-        difficulties = Question.DIFFICULTY_CHOICES
-        result = {}
-        for diff_val, diff_name in difficulties:
-            count = Question.objects.filter(difficulty=diff_val).count()
-            result[diff_val] = {'name': diff_name, 'count': count}
-        return Response(result)
+        return Response(catalog.facet_counts()['facets']['difficulty'])
 
 
-class QuizViewSet(viewsets.ModelViewSet):
+class QuizViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Quiz.objects.filter(is_active=True)
     pagination_class = StandardResultsSetPagination
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    # Quizzes, their question lists and questions all bump the catalog
+    catalog_fingerprint = True
     
     def get_serializer_class(self):
         if self.action == 'retrieve':
             return QuizDetailSerializer
         return QuizSerializer
     
+    def get_queryset(self):
+        queryset = Quiz.objects.filter(is_active=True)
+        if self.action == 'retrieve':
+            return queryset.prefetch_related(Prefetch(
+                'quizquestion_set', queryset=QuizQuestion.objects.select_related('question')
+            ))
+        return queryset.annotate(questions_count=Count('questions')).order_by('id')
+    
     @action(detail=True, methods=['post'])
     def start(self, request, pk=None):
         """Start a new quiz session"""
@@ -109,7 +129,7 @@ class QuizViewSet(viewsets.ModelViewSet):
         session = QuizSession.objects.create(
             user=request.user,
             quiz=quiz,
-            total_questions=quiz.questions.count()
+            total_questions=quiz.questions_count
         )
         
         serializer = QuizSessionSerializer(session)
@@ -120,18 +140,29 @@ class QuizViewSet(viewsets.ModelViewSet):
         """Get quizzes by type"""
         quiz_type = request.query_params.get('type')
         if quiz_type:
-            quizzes = Quiz.objects.filter(quiz_type=quiz_type, is_active=True)
-            serializer = self.get_serializer(quizzes, many=True)
-            return Response(serializer.data)
+            quizzes = self.get_queryset().filter(quiz_type=quiz_type)
+            page = self.paginate_queryset(quizzes)
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
         return Response({'error': 'type parameter required'}, status=400)
 
 
-class QuizSessionViewSet(viewsets.ModelViewSet):
+class QuizSessionViewSet(CursorPaginationMixin, viewsets.ModelViewSet):
     serializer_class = QuizSessionSerializer
     permission_classes = [permissions.IsAuthenticated]
+    cursor_pagination_class = NewestFirstCursorPagination
+    
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return QuizSessionListSerializer
+        return QuizSessionSerializer
     
     def get_queryset(self):
-        return QuizSession.objects.filter(user=self.request.user)
+        queryset = QuizSession.objects.filter(user=self.request.user).select_related('quiz')
+        # Only the full representations nest questions and answers
+        if self.action in ('retrieve', 'review'):
+            queryset = queryset.prefetch_related('questions', 'answers')
+        return queryset
     
     @action(detail=False, methods=['post'])
     def create_custom(self, request):
@@ -172,6 +203,85 @@ class QuizSessionViewSet(viewsets.ModelViewSet):
         serializer = QuizSessionSerializer(session)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
     
+    @action(detail=False, methods=['post'])
+    def generate(self, request):
+        """Create a session with random questions matching topic/category/difficulty"""
+        count = self.get_question_count(request)
+        if count is None:
+            return self.invalid_count_response()
+        
+        exclude = frozenset()
+        if str(request.data.get('exclude_solved', True)).lower() not in ('false', '0'):
+            exclude = self.get_solved_question_ids(request.user)
+        
+        question_ids = question_pools.sample(count, catalog.filters_from(request.data), exclude)
+        if not question_ids:
+            return Response(
+                {'error': 'No questions match these filters'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return self.start_session(request, question_ids, 'Random Quiz')
+    
+    @action(detail=False, methods=['post'])
+    def adaptive(self, request):
+        """Create a practice session pitched at the user's skill in a category"""
+        count = self.get_question_count(request)
+        if count is None:
+            return self.invalid_count_response()
+        
+        picked = adaptive.next_questions(
+            request.user, count, request.data.get('category') or None,
+            self.get_solved_question_ids(request.user)
+        )
+        if not picked['question_ids']:
+            return Response(
+                {'error': 'No unsolved questions left in this category'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        response = self.start_session(request, picked.pop('question_ids'), 'Adaptive Practice')
+        response.data['adaptive'] = picked
+        return response
+    
+    def get_question_count(self, request):
+        """Requested size of a generated session, None when out of range"""
+        try:
+            count = int(request.data.get('count', 10))
+        except (TypeError, ValueError):
+            return None
+        return count if 1 <= count <= question_pools.MAX_SAMPLE else None
+    
+    def invalid_count_response(self):
+        return Response(
+            {'error': f'count must be between 1 and {question_pools.MAX_SAMPLE}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    def get_solved_question_ids(self, user):
+        return frozenset(Answer.objects.filter(
+            session__user=user, is_correct=True
+        ).values_list('question_id', flat=True).distinct())
+    
+    def start_session(self, request, question_ids, default_title):
+        """Create an in-progress session with ``question_ids`` and return it (201)"""
+        with transaction.atomic():
+            session = QuizSession.objects.create(
+                user=request.user,
+                title=request.data.get('title', default_title),
+                quiz_type=request.data.get('quiz_type', 'practice'),
+                time_limit=request.data.get('time_limit', 0),
+                total_questions=len(question_ids),
+                status='in_progress'
+            )
+            QuizSession.questions.through.objects.bulk_create([
+                QuizSession.questions.through(quizsession=session, question_id=question_id)
+                for question_id in question_ids
+            ])
+        
+        serializer = QuizSessionSerializer(session)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    
     @action(detail=True, methods=['post'])
     def submit_answer(self, request, pk=None):
         """Submit an answer to a question in the session"""
@@ -194,130 +304,85 @@ class QuizSessionViewSet(viewsets.ModelViewSet):
         
         question = get_object_or_404(Question, id=question_id)
         
-        # Check if answer already exists for this question
-        existing_answer = Answer.objects.filter(
-            session=session,
-            question=question
-        ).first()
-        
-        was_correct_before = False
-        if existing_answer:
-            was_correct_before = existing_answer.is_correct
-            existing_answer.delete()
-        
-        # Simple correctness check: if user submitted code that's not empty and has substance
-        is_correct = False
-        score = 0
-        
-        code_stripped = user_code.strip()
-        # Mark as correct if user submitted meaningful code (more than just comments/whitespace)
-        if code_stripped and len(code_stripped) > 5:
-            is_correct = True
-            score = 10  # Full score for attempting the question
-        
-        # Create answer record
-        answer = Answer.objects.create(
-            session=session,
-            question=question,
-            user_code=user_code,
-            is_correct=is_correct,
-            score=score
-        )
-        
-        # Update session stats - only adjust for new answer, not re-submission
-        if not existing_answer:  # First time answering this question
-            if is_correct:
-                session.correct_answers += 1
-            else:
-                session.wrong_answers += 1
-            session.total_score += score
-        
-        # Recalculate accuracy based on answered questions
-        answered_count = Answer.objects.filter(session=session).count()
-        if answered_count > 0:
-            session.accuracy = (session.correct_answers / answered_count) * 100
-        
-        session.save()
+        # Store the submission as pending; a Celery worker grades it
+        with transaction.atomic():
+            Answer.objects.bulk_create(
+                [Answer(session=session, question=question, user_code=user_code)],
+                update_conflicts=True,
+                unique_fields=['session', 'question'],
+                update_fields=['user_code', 'status'],
+            )
+            answer_id = Answer.objects.filter(
+                session=session, question=question
+            ).values_list('id', flat=True).get()
+            transaction.on_commit(lambda: grade_answer.delay(answer_id))
         
-        serializer = AnswerSerializer(answer)
-        return Response(serializer.data)
+        # With an eager broker the answer has already been graded
+        return self.answer_response(Answer.objects.get(pk=answer_id))
     
-    @action(detail=True, methods=['get'])
-    def review(self, request, pk=None):
-        """Get quiz session details with all answers for review"""
+    @action(detail=True, methods=['get'], url_path=r'answers/(?P<answer_id>\d+)')
+    def answer(self, request, pk=None, answer_id=None):
+        """Poll the grading state of an answer"""
         session = self.get_object()
-        serializer = QuizSessionSerializer(session)
+        answer = get_object_or_404(Answer, id=answer_id, session=session)
+        return self.answer_response(answer)
+    
+    def answer_response(self, answer):
+        """
+        The answer, or 202 with Retry-After while it is pending: clients poll
+        again instead of holding a web worker open until grading finishes.
+        """
+        serializer = AnswerSerializer(answer)
+        if answer.status == 'pending':
+            return Response(
+                serializer.data,
+                status=status.HTTP_202_ACCEPTED,
+                headers={'Retry-After': str(settings.ANSWER_POLL_INTERVAL)},
+            )
         return Response(serializer.data)
+    
+    @action(detail=True, methods=['post'])
+    def finish(self, request, pk=None):
         """Mark quiz session as completed"""
-        session = self.get_object()
-        session.status = 'completed'
-        session.time_ended = timezone.now()
-        session.save()
-        
-        # Update user profile
-        profile, created = UserProfile.objects.get_or_create(user=request.user)
-        
-        # Update profile stats
-        profile.total_quizzes_completed += 1
-        profile.total_correct_answers += session.correct_answers
-        profile.total_questions_solved += session.total_questions
-        
-        # Calculate overall accuracy
-        if profile.total_questions_solved > 0:
-            profile.overall_accuracy = (profile.total_correct_answers / profile.total_questions_solved) * 100
-        
-        profile.last_practice_date = timezone.now()
-        profile.save()
-        
-        # Update leaderboard entries for different periods
-        from datetime import timedelta
-        from django.utils import timezone as tz
-        from .models import Leaderboard
-        
-        now = tz.now()
-        periods_data = {
-            'week': now - timedelta(days=7),
-            'month': now - timedelta(days=30),
-            'all_time': None
-        }
-        
-        for period, start_date in periods_data.items():
-            # Get all sessions for user in this period
-            if period == 'all_time':
-                user_sessions = QuizSession.objects.filter(user=request.user, status='completed')
-            else:
-                user_sessions = QuizSession.objects.filter(
-                    user=request.user, 
-                    status='completed',
-                    time_ended__gte=start_date
+        with transaction.atomic():
+            session = get_object_or_404(
+                QuizSession.objects.select_for_update(),
+                pk=pk,
+                user=request.user
+            )
+            if session.status == 'completed':
+                return Response(
+                    {'error': 'Quiz session already completed'},
+                    status=status.HTTP_400_BAD_REQUEST
                 )
             
-            if user_sessions.exists():
-                total_score = sum(s.total_score for s in user_sessions)
-                total_questions = sum(s.total_questions for s in user_sessions)
-                total_correct = sum(s.correct_answers for s in user_sessions)
-                accuracy = (total_correct / total_questions * 100) if total_questions > 0 else 0
-                
-                # Update or create leaderboard entry
-                leaderboard, _ = Leaderboard.objects.get_or_create(
-                    user=request.user,
-                    period=period,
-                    defaults={
-                        'rank': 1,
-                        'score': total_score,
-                        'questions_solved': total_questions,
-                        'accuracy': accuracy
-                    }
-                )
-                
-                # Update existing entry
-                leaderboard.score = total_score
-                leaderboard.questions_solved = total_questions
-                leaderboard.accuracy = accuracy
-                leaderboard.save()
+            now = timezone.now()
+            session.status = 'completed'
+            session.time_ended = now
+            session.time_spent = int((now - session.time_started).total_seconds())
+            session.save(update_fields=['status', 'time_ended', 'time_spent', 'updated_at'])
+            
+            UserProfile.objects.filter(user=request.user).update(
+                last_practice_date=now,
+                total_quizzes_completed=F('total_quizzes_completed') + 1
+            )
+            apply_leaderboard_delta(
+                request.user.id,
+                timezone.localdate(now),
+                score=session.total_score,
+                questions=session.total_questions,
+                correct=session.correct_answers
+            )
         
         serializer = QuizSessionSerializer(session)
         return Response(serializer.data)
+    
+    @action(detail=True, methods=['get'])
+    def review(self, request, pk=None):
+        """Get quiz session details with all answers for review"""
+        session = self.get_object()
+        serializer = QuizSessionSerializer(session)
+        return Response(serializer.data)
 
 
 class UserProfileViewSet(viewsets.ModelViewSet):
@@ -325,12 +390,17 @@ class UserProfileViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return UserProfile.objects.filter(user=self.request.user)
+        return UserProfile.objects.filter(user=self.request.user).select_related(
+            'user'
+        ).prefetch_related('user__category_stats')
     
     @action(detail=False, methods=['get'])
     def me(self, request):
         """Get current user profile"""
-        profile, created = UserProfile.objects.get_or_create(user=request.user)
+        # weak/strong areas are derived from the prefetched category counters
+        profile, created = UserProfile.objects.prefetch_related(
+            'user__category_stats'
+        ).select_related('user').get_or_create(user=request.user)
         serializer = self.get_serializer(profile)
         return Response(serializer.data)
 
@@ -374,23 +444,66 @@ class BookmarkViewSet(viewsets.ModelViewSet):
         return Response({'is_bookmarked': is_bookmarked})
 
 
-class LeaderboardViewSet(viewsets.ReadOnlyModelViewSet):
+class LeaderboardViewSet(CursorPaginationMixin, ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = LeaderboardSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    cursor_pagination_class = RankCursorPagination
     
     def get_queryset(self):
         period = self.request.query_params.get('period', 'week')
-        return Leaderboard.objects.filter(period=period).order_by('rank')
+        return ranked_leaderboard(period).select_related('user')
+    
+    def get_period(self):
+        period = self.request.query_params.get('period', 'week')
+        return period if period in LEADERBOARD_PERIODS else None
+    
+    def list(self, request, *args, **kwargs):
+        """Leaderboard page served from the ranked cache"""
+        period = self.get_period()
+        # Cursor pages walk the (period, score) index instead
+        if period is None or self.uses_cursor_pagination():
+            return super().list(request, *args, **kwargs)
+        return self.conditional_response(request, lambda: self.cached_page(request, period))
+    
+    def cached_page(self, request, period):
+        page = self.paginate_queryset(leaderboard_cache.RankedPeriod(period))
+        # Cached rows are already serialized; apply ?fields= to them directly
+        requested = requested_fields(request)
+        if requested:
+            page = [{name: row[name] for name in row if name in requested} for row in page]
+        return self.get_paginated_response(page)
+    
+    def get_fingerprint(self):
+        period = self.get_period()
+        if period is None:
+            return super().get_fingerprint()
+        # Ranks depend on every entry of the period, which the ranked
+        # cache's version follows; cached pages need nothing else
+        fingerprint = {'leaderboard': leaderboard_cache.version(period)}
+        if self.action == 'retrieve' or self.uses_cursor_pagination():
+            fingerprint.update(super().get_fingerprint())
+        return fingerprint
     
     @action(detail=False, methods=['get'])
     def top_performers(self, request):
         """Get top 10 performers"""
-        period = request.query_params.get('period', 'week')
-        leaders = Leaderboard.objects.filter(
-            period=period
-        ).order_by('rank')[:10]
-        serializer = self.get_serializer(leaders, many=True)
-        return Response(serializer.data)
+        period = self.get_period()
+        if period is None:
+            return Response([])
+        return self.conditional_response(request, lambda: Response(leaderboard_cache.top(period, 10)))
+    
+    @action(detail=False, methods=['get'], permission_classes=[permissions.IsAuthenticated])
+    def my_rank(self, request):
+        """Current user's entry and its neighbours (?radius=5)"""
+        period = self.get_period()
+        try:
+            radius = min(max(int(request.query_params.get('radius', 5)), 0), 50)
+        except ValueError:
+            radius = 5
+        if period is None:
+            return Response({'entry': None, 'neighbours': []})
+        entry, neighbours = leaderboard_cache.around(period, request.user.id, radius)
+        return Response({'entry': entry, 'neighbours': neighbours})
 
 
 # Authentication Endpoints
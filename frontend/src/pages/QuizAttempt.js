@@ -3,7 +3,7 @@ import { useParams, useNavigate } from 'react-router-dom';
 import AceEditor from 'react-ace';
 import 'ace-builds/src-noconflict/mode-python';
 import 'ace-builds/src-noconflict/theme-monokai';
-import { sessionsAPI } from '../services/api';
+import { sessionsAPI, waitForGrade } from '../services/api';
 
 const QuizAttempt = () => {
   const { sessionId } = useParams();
@@ -78,15 +78,16 @@ const QuizAttempt = () => {
       setSubmitting(true);
       const currentQuestion = questions[currentIndex];
 
-      await sessionsAPI.submitAnswer(sessionId, {
+      const response = await sessionsAPI.submitAnswer(sessionId, {
         question_id: currentQuestion.id,
         code,
       });
+      const answer = await waitForGrade(sessionId, response);
 
-      // Store answer
+      // Store the graded answer
       setAnswers(prev => ({
         ...prev,
-        [currentQuestion.id]: code,
+        [currentQuestion.id]: answer,
       }));
 
       // Move to next question
@@ -165,6 +166,10 @@ const QuizAttempt = () => {
             <div className="bg-blue-50 rounded-lg p-6 mb-8">
               <p className="text-gray-600 text-sm mb-2">Questions Answered</p>
               <p className="text-4xl font-bold text-blue-600">{Object.keys(answers).length} / {questions.length}</p>
+              <p className="text-gray-600 text-sm mt-4 mb-2">Correct Answers</p>
+              <p className="text-4xl font-bold text-green-600">
+                {Object.values(answers).filter(answer => answer.is_correct).length} / {questions.length}
+              </p>
             </div>
 
             <div className="space-y-3">
@@ -38,6 +38,7 @@ const QuizBuilder = () => {
       const response = await questionsAPI.getAll({
         category: quizConfig.category,
         limit: 100, // Get more to choose from
+        fields: 'id,title,difficulty,category',
       });
       
       const allQuestions = Array.isArray(response.data) ? response.data : response.data.results || [];
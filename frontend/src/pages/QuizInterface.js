@@ -3,7 +3,7 @@ import { useParams } from 'react-router-dom';
 import AceEditor from 'react-ace';
 import 'ace-builds/src-noconflict/mode-python';
 import 'ace-builds/src-noconflict/theme-github';
-import { quizzesAPI, sessionsAPI } from '../services/api';
+import { quizzesAPI, sessionsAPI, waitForGrade } from '../services/api';
 import Timer from '../components/Timer';
 
 const QuizInterface = () => {
@@ -14,6 +14,7 @@ const QuizInterface = () => {
   const [code, setCode] = useState('');
   const [loading, setLoading] = useState(true);
   const [submitting, setSubmitting] = useState(false);
+  const [lastAnswer, setLastAnswer] = useState(null);
 
   useEffect(() => {
     initializeQuiz();
@@ -46,10 +47,11 @@ const QuizInterface = () => {
       setSubmitting(true);
       const currentQuestion = quiz.questions[currentQuestionIndex].question;
       
-      await sessionsAPI.submitAnswer(session.id, {
+      const response = await sessionsAPI.submitAnswer(session.id, {
         question_id: currentQuestion.id,
         code,
       });
+      setLastAnswer(await waitForGrade(session.id, response));
 
       // Move to next question
       if (currentQuestionIndex < quiz.questions.length - 1) {
@@ -138,6 +140,13 @@ const QuizInterface = () => {
             />
           </div>
 
+          {lastAnswer && (
+            <div className={`p-3 rounded mb-4 text-sm ${lastAnswer.is_correct ? 'bg-green-100 text-green-800' : 'bg-red-100 text-red-800'}`}>
+              Previous answer: {lastAnswer.is_correct ? 'Correct' : 'Incorrect'}
+              {lastAnswer.feedback && ` (${lastAnswer.feedback})`}
+            </div>
+          )}
+
           <div className="flex gap-4">
             {currentQuestionIndex > 0 && (
               <button
@@ -58,11 +58,24 @@ export const sessionsAPI = {
   getAll: () => api.get('/sessions/'),
   getById: (id) => api.get(`/sessions/${id}/`),
   submitAnswer: (id, data) => api.post(`/sessions/${id}/submit_answer/`, data),
+  getAnswer: (id, answerId) => api.get(`/sessions/${id}/answers/${answerId}/`),
   finish: (id) => api.post(`/sessions/${id}/finish/`),
   review: (id) => api.get(`/sessions/${id}/review/`),
   createCustomSession: (data) => api.post('/sessions/create_custom/', data),
 };
 
+// Poll a submitted answer until it is graded. Pending answers come back
+// as 202 with a Retry-After header saying when to ask again.
+export const waitForGrade = async (sessionId, response) => {
+  let current = response;
+  while (current.status === 202) {
+    const seconds = Number(current.headers['retry-after']) || 1;
+    await new Promise((resolve) => setTimeout(resolve, seconds * 1000));
+    current = await sessionsAPI.getAnswer(sessionId, current.data.id);
+  }
+  return current.data;
+};
+
 // User Profile API
 export const profileAPI = {
   getMe: () => api.get('/profile/me/'),